@@ -1,11 +1,16 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from database import AsyncSessionLocal, async_engine
 from models import User
 import os
 
@@ -14,7 +19,32 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7 # 7 Days
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Principal cache: how long a token subject maps to a user without re-checking the DB
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Trust the uid claim in tokens and skip the user lookup entirely. Deleted users
+# then keep access until their token expires, so this is off by default.
+AUTH_TRUST_TOKEN_UID = os.getenv("AUTH_TRUST_TOKEN_UID", "false").lower() in ("1", "true", "yes")
+
+# Argon2 cost. Defaults match passlib's; raising any of them makes existing
+# hashes get upgraded transparently on the user's next login.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+# Hashing runs on its own small pool so login bursts can't starve the event
+# loop or the default executor. Beyond HASH_QUEUE_LIMIT waiting requests we
+# shed load with a 503 instead of queueing indefinitely.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "64"))
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/login")
 
 def verify_password(plain_password, hashed_password):
@@ -23,6 +53,34 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="argon2")
+_hash_pending = 0
+
+async def _run_hashing(fn, *args):
+    """Run a hashing call on the dedicated pool, rejecting work once the queue is full."""
+    global _hash_pending
+    if _hash_pending >= HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_pending -= 1
+
+async def get_password_hash_async(password):
+    return await _run_hashing(pwd_context.hash, password)
+
+async def verify_and_update_async(plain_password, hashed_password):
+    """Verify off the event loop. Returns (valid, new_hash); new_hash is set when the stored hash uses outdated parameters."""
+    return await _run_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
+def shutdown_hashing():
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -33,21 +91,108 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+class Principal:
+    """The authenticated user as routes see it, detached from any DB session."""
+    __slots__ = ("id", "username")
+
+    def __init__(self, id: int, username: str):
+        self.id = id
+        self.username = username
+
+class PrincipalCache:
+    """TTL + LRU map from token subject to Principal."""
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, subject: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if time.monotonic() > expires_at:
+                del self._entries[subject]
+                return None
+            self._entries.move_to_end(subject)
+            return principal
+
+    def put(self, subject: str, principal: Principal):
+        with self._lock:
+            self._entries[subject] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            self._entries.pop(subject, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+principal_cache = PrincipalCache()
+
+# Verified tokens -> claims, so repeat requests skip signature checks. Entries
+# never outlive the token's own expiry.
+_verified_tokens = OrderedDict()
+_verified_tokens_lock = threading.Lock()
+
+def _decode_token(token: str) -> dict:
+    now = time.time()
+    with _verified_tokens_lock:
+        entry = _verified_tokens.get(token)
+        if entry is not None and now < entry[1]:
+            _verified_tokens.move_to_end(token)
+            return entry[0]
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    expires_at = min(payload.get("exp", now), now + AUTH_CACHE_TTL)
+    with _verified_tokens_lock:
+        _verified_tokens[token] = (payload, expires_at)
+        while len(_verified_tokens) > AUTH_CACHE_MAX_ENTRIES:
+            _verified_tokens.popitem(last=False)
+    return payload
+
+def invalidate_user(username: str):
+    """Drop a cached principal. Call after changing a user's password or deleting/renaming them."""
+    principal_cache.invalidate(username)
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+
+    uid = payload.get("uid")
+    if AUTH_TRUST_TOKEN_UID and isinstance(uid, int):
+        return Principal(uid, username)
+
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+
+    if async_engine is None:
+        raise Exception("Database not configured")
+    # A session of its own, closed right away: a request-scoped one would hold its
+    # connection until teardown, i.e. through the whole LLM call on generate routes
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User.id).where(User.username == username))
+        user_id = result.scalar()
+    if user_id is None:
         raise credentials_exception
-    return user
+    principal = Principal(user_id, username)
+    principal_cache.put(username, principal)
+    return principal
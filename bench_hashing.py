@@ -0,0 +1,41 @@
+"""Measure argon2 throughput with the configured cost parameters.
+
+Usage: python bench_hashing.py [--seconds 5] [--threads N]
+
+Reports single-thread hashes/sec and the aggregate rate with N threads,
+which is what the login pool (HASH_WORKERS) can sustain. Tune
+ARGON2_TIME_COST / ARGON2_MEMORY_COST / ARGON2_PARALLELISM with this before
+changing them in production.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from auth import pwd_context, ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM, HASH_WORKERS
+
+def _hash_for(seconds: float) -> int:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pwd_context.hash("correct horse battery staple")
+        count += 1
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark argon2 password hashing.")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run")
+    parser.add_argument("--threads", type=int, default=HASH_WORKERS, help="Threads for the parallel run (default: HASH_WORKERS)")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    print(f"argon2id t={ARGON2_TIME_COST} m={ARGON2_MEMORY_COST}KiB p={ARGON2_PARALLELISM}, {cores} cores")
+
+    single = _hash_for(args.seconds) / args.seconds
+    print(f"1 thread:  {single:7.1f} hashes/s  ({1000 / single:.1f} ms/hash)")
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        total = sum(pool.map(_hash_for, [args.seconds] * args.threads)) / args.seconds
+    print(f"{args.threads} threads: {total:7.1f} hashes/s  ({total / min(args.threads, cores):.1f} per core)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import os
+import time
+
+# End-to-end time allowed per route, in seconds
+GENERATE_TIMEOUT_SECONDS = float(os.getenv("GENERATE_TIMEOUT_SECONDS", "180"))
+STREAM_TIMEOUT_SECONDS = float(os.getenv("STREAM_TIMEOUT_SECONDS", "300"))
+# Share of a route's budget that reference extraction may use, and the share
+# held back for persisting the result; the LLM call gets the rest
+BUDGET_EXTRACTION_SHARE = float(os.getenv("BUDGET_EXTRACTION_SHARE", "0.2"))
+BUDGET_PERSISTENCE_SHARE = float(os.getenv("BUDGET_PERSISTENCE_SHARE", "0.05"))
+# How often a waiting request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+
+class RequestBudget:
+    """A request's deadline, split across extraction, the LLM call and persistence."""
+
+    def __init__(self, total: float):
+        self.total = total
+        self.expires_at = time.monotonic() + total
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def extraction(self) -> float:
+        return min(self.remaining(), self.total * BUDGET_EXTRACTION_SHARE)
+
+    def llm(self) -> float:
+        """Time left for generation once the persistence reserve is set aside."""
+        return max(0.0, self.remaining() - self.total * BUDGET_PERSISTENCE_SHARE)
@@ -0,0 +1,143 @@
+"""Train a zlib preset dictionary for script bodies from stored scripts.
+
+Usage: python build_zdict.py [--store scripts] [--db] [--examples] [--size 16384] [--out zdict.bin]
+
+Samples are serialized exactly as script_codec.pack_content does. Every
+fifth sample is held out, and the report compares plain zlib, the current
+dictionary and the trained one on those held-out samples, so the ratio
+printed is what new rows can expect. To ship a trained dictionary, add it
+to script_codec as a new version and bump CURRENT_DICTIONARY; never
+replace a published one.
+"""
+import argparse
+import gzip
+import json
+import zlib
+from collections import Counter
+from pathlib import Path
+from script_codec import SCRIPT_CONTENT_LEVEL, CURRENT_DICTIONARY, _DICTIONARIES
+
+PROMPT_FILES = ("prompt.txt", "prompt_asmr.txt", "prompt_no_host.txt")
+
+def _serialize(content) -> bytes:
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def load_store(root: Path) -> list[bytes]:
+    """Script bodies from the content-addressed store (objects/**/*.json.gz)."""
+    samples = []
+    for path in sorted((root / "objects").glob("*/*/*.json.gz")):
+        with gzip.open(path, 'rb') as f:
+            samples.append(_serialize(json.loads(f.read())))
+    return samples
+
+def load_db() -> list[bytes]:
+    """Script bodies from the scripts table at DATABASE_URL."""
+    from database import SessionLocal
+    from models import Script
+    db = SessionLocal()
+    try:
+        return [_serialize(script.content) for script in db.query(Script).order_by(Script.id).yield_per(500)
+                if isinstance(script.content, dict)]
+    finally:
+        db.close()
+
+def load_examples() -> list[bytes]:
+    """The example_output of each shipped prompt; a floor for empty installs, not a corpus."""
+    samples = []
+    for name in PROMPT_FILES:
+        path = Path(name)
+        if not path.exists():
+            continue
+        stack = [json.loads(path.read_text(encoding='utf-8'))]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                if isinstance(node.get("example_output"), dict):
+                    samples.append(_serialize(node["example_output"]))
+                stack.extend(node.values())
+    return samples
+
+def build_dictionary(samples: list[bytes], size: int, k: int = 8) -> bytes:
+    """Pick the substrings shared by the most samples, most valuable last.
+
+    A byte run counts as shared when every k-gram in it occurs in at least two
+    samples (or in one, for a single-sample corpus). Runs are scored by
+    document frequency times length; zlib finds matches near the end of the
+    dictionary most cheaply, so the best runs go there.
+    """
+    min_df = 2 if len(samples) > 1 else 1
+    df = Counter()
+    for sample in samples:
+        df.update({sample[i:i + k] for i in range(len(sample) - k + 1)})
+
+    runs = Counter()
+    for sample in samples:
+        seen = set()
+        start = None
+        for i in range(len(sample) - k + 2):
+            frequent = i <= len(sample) - k and df[sample[i:i + k]] >= min_df
+            if frequent and start is None:
+                start = i
+            elif not frequent and start is not None:
+                seen.add(sample[start:i + k - 1])
+                start = None
+        runs.update(seen)
+
+    ranked = sorted(runs.items(), key=lambda item: (item[1] * len(item[0]), item[0]), reverse=True)
+    chosen = []
+    total = 0
+    for run, _ in ranked:
+        if total + len(run) > size:
+            continue
+        if any(run in other for other in chosen):
+            continue
+        chosen.append(run)
+        total += len(run)
+    return b"".join(reversed(chosen))
+
+def _compressed_size(samples: list[bytes], zdict: bytes = None) -> int:
+    total = 0
+    for sample in samples:
+        compressor = zlib.compressobj(SCRIPT_CONTENT_LEVEL, zdict=zdict) if zdict else zlib.compressobj(SCRIPT_CONTENT_LEVEL)
+        total += len(compressor.compress(sample) + compressor.flush()) + (1 if zdict else 0)
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a zlib preset dictionary for script bodies.")
+    parser.add_argument("--store", type=Path, default=Path("scripts"), help="Content-addressed script store to read")
+    parser.add_argument("--db", action="store_true", help="Also read script bodies from DATABASE_URL")
+    parser.add_argument("--examples", action="store_true", help="Also use the example_output of the shipped prompts")
+    parser.add_argument("--size", type=int, default=16 * 1024, help="Dictionary size in bytes (zlib uses at most 32 KiB)")
+    parser.add_argument("--out", type=Path, help="Write the trained dictionary here")
+    args = parser.parse_args()
+
+    samples = load_store(args.store)
+    if args.db:
+        samples += load_db()
+    if args.examples:
+        samples += load_examples()
+    samples = sorted(set(samples))
+    if not samples:
+        parser.error("no scripts found; generate some first or pass --db/--examples")
+
+    holdout = samples[::5] if len(samples) >= 5 else samples
+    training = [s for i, s in enumerate(samples) if i % 5] if len(samples) >= 5 else samples
+    if holdout is samples:
+        print(f"Warning: only {len(samples)} sample(s); evaluating on the training set, so the trained ratio is optimistic")
+
+    zdict = build_dictionary(training, args.size)
+    raw = sum(len(s) for s in holdout)
+    print(f"{len(training)} training / {len(holdout)} held-out scripts, {raw} bytes held out")
+    for label, size in (
+        ("plain zlib", _compressed_size(holdout)),
+        (f"current dictionary (v{CURRENT_DICTIONARY})", _compressed_size(holdout, _DICTIONARIES[CURRENT_DICTIONARY])),
+        (f"trained dictionary ({len(zdict)} bytes)", _compressed_size(holdout, zdict)),
+    ):
+        print(f"{label:32s} {size:8d} bytes  {raw / size:5.2f}x")
+
+    if args.out:
+        args.out.write_bytes(zdict)
+        print(f"Dictionary written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+
+RESPONSE_CACHE_PATH = Path(os.getenv("RESPONSE_CACHE_PATH", Path.cwd() / ".cache" / "responses.sqlite"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600))) # 7 Days
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+RESPONSE_CACHE_MEMORY_ENTRIES = int(os.getenv("RESPONSE_CACHE_MEMORY_ENTRIES", "256"))
+# Memory-tier hits are written back to SQLite's accessed_at in batches, at least this often
+RESPONSE_CACHE_TOUCH_SECONDS = float(os.getenv("RESPONSE_CACHE_TOUCH_SECONDS", "5"))
+RESPONSE_CACHE_TOUCH_BATCH = int(os.getenv("RESPONSE_CACHE_TOUCH_BATCH", "64"))
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+# Cosine similarity for a hit; 0.85 lets one extra word in four through ("garlic butter steak short")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+# Hashed feature space; stored sparse, so it is sized for few collisions rather than memory
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", str(1 << 24)))
+# Share of distinct words (Jaccard) a stored prompt must have in common with the query
+SEMANTIC_CACHE_MIN_OVERLAP = float(os.getenv("SEMANTIC_CACHE_MIN_OVERLAP", "0.6"))
+
+def make_cache_key(model: str, system_prompt_hash: str, user_prompt: str, reference_content: str, temperature: float) -> str:
+    """Stable hash of everything that determines a generation."""
+    payload = json.dumps([model, system_prompt_hash, user_prompt, reference_content, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """Exact-match cache for generated scripts.
+
+    An in-memory LRU sits in front of a SQLite table that holds entries for
+    `ttl` seconds and keeps at most `max_entries` rows, dropping the least
+    recently used first. Hits served from memory are recorded in SQLite in
+    batches so hot keys don't look idle to the persistent tier. Safe to call
+    from worker threads.
+    """
+
+    def __init__(self, path: Path = RESPONSE_CACHE_PATH, ttl: int = RESPONSE_CACHE_TTL,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, memory_entries: int = RESPONSE_CACHE_MEMORY_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        # key -> last memory-hit time not yet written to SQLite
+        self._touched = {}
+        self._touched_at = time.monotonic()
+        self._evict_listeners = []
+        self._lock = threading.Lock()
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                model TEXT,
+                style_hash TEXT,
+                prompt TEXT,
+                reference_hash TEXT,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._touched[key] = now
+                    if len(self._touched) >= RESPONSE_CACHE_TOUCH_BATCH or time.monotonic() - self._touched_at >= RESPONSE_CACHE_TOUCH_SECONDS:
+                        self._flush_touches()
+                        self._conn.commit()
+                    return value
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._count -= 1
+                expired = [key]
+            else:
+                expired = None
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+        if expired:
+            self._notify_evicted(expired)
+            return None
+        return value
+
+    def put(self, key: str, value: dict, model: str = None, style_hash: str = None,
+            prompt: str = None, reference_hash: str = None):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO responses (key, value, model, style_hash, prompt, reference_hash, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(value, separators=(',', ':')), model, style_hash, prompt, reference_hash, now, now)
+            )
+            if cursor.rowcount:
+                self._count += 1
+            else:
+                self._conn.execute(
+                    "UPDATE responses SET value = ?, created_at = ?, accessed_at = ? WHERE key = ?",
+                    (json.dumps(value, separators=(',', ':')), now, now, key)
+                )
+            evicted = None
+            if self._count > self.max_entries:
+                self._flush_touches()
+                evicted = self._evict(now)
+            self._conn.commit()
+        if evicted:
+            self._notify_evicted(evicted)
+
+    def on_evict(self, callback):
+        """Register `callback(keys)`, called with keys dropped from the persistent tier."""
+        self._evict_listeners.append(callback)
+
+    def _notify_evicted(self, keys: list):
+        for callback in self._evict_listeners:
+            try:
+                callback(keys)
+            except Exception as e:
+                print(f"Warning: cache eviction listener failed: {e}")
+
+    def iter_prompts(self):
+        """Yield (key, style_hash, prompt) for live entries generated without reference material."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, style_hash, prompt FROM responses "
+                "WHERE reference_hash IS NULL AND prompt IS NOT NULL AND created_at >= ?",
+                (time.time() - self.ttl,)
+            ).fetchall()
+        yield from rows
+
+    def _remember(self, key: str, value: dict, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _flush_touches(self):
+        """Write pending memory-tier hits to accessed_at; the caller commits."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(at, key) for key, at in self._touched.items()]
+            )
+            self._touched.clear()
+        self._touched_at = time.monotonic()
+
+    def _evict(self, now: float) -> list:
+        """Drop expired rows, then the least recently used ones, down to 90% of capacity.
+
+        Returns the evicted keys.
+        """
+        evicted = [row[0] for row in self._conn.execute(
+            "SELECT key FROM responses WHERE created_at < ?", (now - self.ttl,)
+        )]
+        excess = self._count - len(evicted) - int(self.max_entries * 0.9)
+        if excess > 0:
+            evicted += [row[0] for row in self._conn.execute(
+                "SELECT key FROM responses WHERE created_at >= ? ORDER BY accessed_at LIMIT ?",
+                (now - self.ttl, excess)
+            )]
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in evicted])
+        self._count -= len(evicted)
+        for key in evicted:
+            self._memory.pop(key, None)
+            self._touched.pop(key, None)
+        return evicted
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Only function words; dish words like "short" (rib) or "recipe" stay in
+_STOPWORDS = frozenset(
+    "a an and the with of for in on to my our your how make making "
+    "about from into at by is are".split()
+)
+
+def _normalize_token(token: str) -> str:
+    # Crude plural folding so "steaks" and "steak" share a feature
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def prompt_tokens(text: str) -> dict:
+    """Normalized content words of a prompt with their counts."""
+    counts = {}
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        token = _normalize_token(token)
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+def embed_prompt(text: str, dim: int = SEMANTIC_CACHE_DIM) -> tuple[np.ndarray, np.ndarray]:
+    """Hash a prompt into a sparse unit-length bag-of-words vector; no model, no network.
+
+    Returns (features, weights): sorted int32 feature ids and their float32 weights.
+    """
+    weights = {}
+    for token, count in prompt_tokens(text).items():
+        feature = zlib.crc32(token.encode('utf-8')) % dim
+        weights[feature] = weights.get(feature, 0.0) + 1.0 + math.log(count)
+    features = sorted(weights)
+    values = np.array([weights[f] for f in features], dtype=np.float32)
+    norm = np.linalg.norm(values)
+    if norm > 0:
+        values /= norm
+    return np.array(features, dtype=np.int32), values
+
+def _overlap(a: frozenset, b: frozenset) -> float:
+    """Jaccard overlap of two prompts' word sets."""
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+def _empty_matrix():
+    return np.zeros(0, np.int32), np.zeros(0, np.int32), np.zeros(0, np.float32)
+
+class _StyleIndex:
+    """Prompt vectors for one system prompt, as a float32 sparse matrix stored feature-major.
+
+    The non-zeros are sorted by feature (CSC), so a query locates the columns
+    of its few features with searchsorted and scores every stored prompt with
+    one bincount. New prompts go to a small tail that is merged in once it
+    grows; removed slots are masked out and compacted away once a quarter of
+    the slots are dead. Each cache key holds one slot; re-adding a key replaces it.
+    """
+
+    # Non-zeros the tail may hold before it is merged into the sorted matrix
+    TAIL_NNZ = 1024
+
+    def __init__(self):
+        self._matrix = _empty_matrix()
+        # (slot, features, weights) added since the last merge
+        self._tail = []
+        self._tail_nnz = 0
+        self._tail_matrix = None
+        self._alive = np.zeros(1024, dtype=np.float32)
+        # slot -> key and slot -> word set; None once removed
+        self.keys = []
+        self.words = []
+        self.slot_of = {}
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    def add(self, key: str, words: frozenset, features: np.ndarray, weights: np.ndarray):
+        self.remove(key)
+        slot = len(self.keys)
+        if slot == len(self._alive):
+            self._alive = np.concatenate([self._alive, np.zeros(slot, dtype=np.float32)])
+        self._alive[slot] = 1.0
+        self.keys.append(key)
+        self.words.append(words)
+        self.slot_of[key] = slot
+        self._tail.append((slot, features, weights))
+        self._tail_nnz += len(features)
+        self._tail_matrix = None
+        if self._tail_nnz >= self.TAIL_NNZ:
+            self._merge_tail()
+
+    def remove(self, key: str):
+        slot = self.slot_of.pop(key, None)
+        if slot is None:
+            return
+        self._alive[slot] = 0.0
+        self.keys[slot] = None
+        self.words[slot] = None
+        if len(self.keys) - len(self.slot_of) > max(1024, len(self.keys) // 4):
+            self._compact()
+
+    def _stack_tail(self):
+        if not self._tail:
+            return _empty_matrix()
+        features = np.concatenate([f for _, f, _ in self._tail])
+        slots = np.repeat(np.array([slot for slot, _, _ in self._tail], dtype=np.int32),
+                          [len(f) for _, f, _ in self._tail])
+        weights = np.concatenate([w for _, _, w in self._tail])
+        order = np.argsort(features, kind='stable')
+        return features[order], slots[order], weights[order]
+
+    def _merge_tail(self):
+        tail = self._stack_tail() if self._tail_matrix is None else self._tail_matrix
+        positions = np.searchsorted(self._matrix[0], tail[0], 'right')
+        self._matrix = tuple(np.insert(column, positions, values) for column, values in zip(self._matrix, tail))
+        self._tail = []
+        self._tail_nnz = 0
+        self._tail_matrix = None
+
+    def _compact(self):
+        """Drop removed slots from the matrix and renumber the live ones densely."""
+        self._merge_tail()
+        size = len(self.keys)
+        alive = self._alive[:size] > 0
+        renumber = np.cumsum(alive, dtype=np.int32) - 1
+        features, slots, weights = self._matrix
+        keep = alive[slots]
+        self._matrix = (features[keep], renumber[slots[keep]], weights[keep])
+        self.keys = [key for key in self.keys if key is not None]
+        self.words = [words for words in self.words if words is not None]
+        self.slot_of = {key: slot for slot, key in enumerate(self.keys)}
+        self._alive = np.zeros(max(1024, 2 * len(self.keys)), dtype=np.float32)
+        self._alive[:len(self.keys)] = 1.0
+
+    def nearest(self, words: frozenset, features: np.ndarray, weights: np.ndarray, threshold: float, min_overlap: float):
+        """Best (key, score) at or above `threshold` whose words also overlap enough, else (None, top score)."""
+        if not self.slot_of:
+            return None, 0.0
+        if self._tail_matrix is None:
+            self._tail_matrix = self._stack_tail()
+        slots, products = [], []
+        for matrix_features, matrix_slots, matrix_weights in (self._matrix, self._tail_matrix):
+            starts = np.searchsorted(matrix_features, features, 'left')
+            ends = np.searchsorted(matrix_features, features, 'right')
+            for start, end, weight in zip(starts.tolist(), ends.tolist(), weights.tolist()):
+                if end > start:
+                    slots.append(matrix_slots[start:end])
+                    products.append(matrix_weights[start:end] * weight)
+        if not slots:
+            return None, 0.0
+        size = len(self.keys)
+        scores = np.bincount(np.concatenate(slots), weights=np.concatenate(products), minlength=size)
+        if size > len(self.slot_of):
+            scores *= self._alive[:size]
+        candidates = np.flatnonzero(scores >= threshold)
+        for slot in candidates[np.argsort(-scores[candidates], kind='stable')].tolist():
+            # Guards against hash collisions and one-word prompts matching anything containing that word
+            if _overlap(words, self.words[slot]) >= min_overlap:
+                return self.keys[slot], float(scores[slot])
+        return None, float(scores.max())
+
+class SemanticCache:
+    """Near-duplicate prompt lookup on top of a ResponseCache.
+
+    Keeps one index per style (system prompt hash) mapping prompt vectors to
+    exact-cache keys. The scripts themselves stay in the ResponseCache, which
+    tells the index about evicted keys so it never grows past the cache.
+    """
+
+    def __init__(self, response_cache: ResponseCache = None, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 dim: int = SEMANTIC_CACHE_DIM, min_overlap: float = SEMANTIC_CACHE_MIN_OVERLAP):
+        self.threshold = threshold
+        self.dim = dim
+        self.min_overlap = min_overlap
+        self._indexes = {}
+        # key -> style, so evictions (which only know keys) can find the index
+        self._style_of = {}
+        self._lock = threading.Lock()
+        if response_cache is not None:
+            response_cache.on_evict(self.discard)
+            for key, style_hash, prompt in response_cache.iter_prompts():
+                self.add(style_hash, prompt, key)
+
+    def add(self, style_hash: str, prompt: str, key: str):
+        features, weights = embed_prompt(prompt, self.dim)
+        with self._lock:
+            self._discard(key)
+            if not len(features):
+                return
+            index = self._indexes.get(style_hash)
+            if index is None:
+                index = self._indexes[style_hash] = _StyleIndex()
+            index.add(key, frozenset(prompt_tokens(prompt)), features, weights)
+            self._style_of[key] = style_hash
+
+    def discard(self, keys):
+        """Forget cache keys, e.g. ones the ResponseCache evicted."""
+        with self._lock:
+            for key in keys:
+                self._discard(key)
+
+    def _discard(self, key: str):
+        style_hash = self._style_of.pop(key, None)
+        if style_hash is None:
+            return
+        index = self._indexes[style_hash]
+        index.remove(key)
+        if not len(index):
+            del self._indexes[style_hash]
+
+    def lookup(self, style_hash: str, prompt: str):
+        """Return (key, similarity) for the closest stored prompt above the threshold, else (None, score)."""
+        features, weights = embed_prompt(prompt, self.dim)
+        if not len(features):
+            return None, 0.0
+        with self._lock:
+            index = self._indexes.get(style_hash)
+            if index is None:
+                return None, 0.0
+            return index.nearest(frozenset(prompt_tokens(prompt)), features, weights, self.threshold, self.min_overlap)
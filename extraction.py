@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import pypdf
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Total characters of extracted text kept in the cache across all uploads
+EXTRACTION_CACHE_MAX_CHARS = int(os.getenv("EXTRACTION_CACHE_MAX_CHARS", str(64 * 1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Where uploads are spooled; None means the system temp directory
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR")
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+        self.max_bytes = max_bytes
+
+def _extract_pdf_text(path: str) -> str:
+    """Runs in a worker process: pull the text out of every page of a spooled PDF."""
+    # PdfReader seeks within the file, so pages are read on demand rather than all at once
+    with open(path, 'rb') as f:
+        reader = pypdf.PdfReader(f)
+        return "".join(f"{page.extract_text() or ''}\n" for page in reader.pages)
+
+def _decode_text(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+class ReferenceExtractor:
+    """Turns uploaded reference files into text without blocking the event loop.
+
+    PDFs are parsed in a process pool. Results are cached by the SHA-256 of the
+    upload bytes with LRU eviction bounded by total cached characters, and
+    concurrent uploads of the same file share a single extraction.
+    """
+
+    def __init__(self, max_workers: int = EXTRACTION_WORKERS, max_cache_chars: int = EXTRACTION_CACHE_MAX_CHARS):
+        self.max_workers = max_workers
+        self.max_cache_chars = max_cache_chars
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cached_chars = 0
+        self._inflight = {}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    async def extract_upload(self, upload, max_bytes: int = MAX_UPLOAD_BYTES) -> tuple[str, str]:
+        """Spool an UploadFile to disk in chunks and return (text, sha256 hex digest).
+
+        Raises UploadTooLarge as soon as more than `max_bytes` have been read.
+        """
+        path, digest = await self._spool(upload, max_bytes)
+        owns_file = True
+        try:
+            text = self._cache_get(digest)
+            if text is not None:
+                return text, digest
+
+            # Piggyback on an extraction of the same bytes that is already running
+            pending = self._inflight.get(digest)
+            if pending is None:
+                pending = asyncio.ensure_future(self._run(path, upload.filename or ""))
+                self._inflight[digest] = pending
+                pending.add_done_callback(lambda _: self._inflight.pop(digest, None))
+                # The shared extraction reads this file, and may outlive this request
+                # (other uploads wait on it), so it removes the file when it finishes
+                loop = asyncio.get_running_loop()
+                pending.add_done_callback(lambda _: loop.run_in_executor(None, _remove_quietly, path))
+                owns_file = False
+            text = await asyncio.shield(pending)
+
+            self._cache_put(digest, text)
+            return text, digest
+        finally:
+            if owns_file:
+                await asyncio.to_thread(_remove_quietly, path)
+
+    async def _spool(self, upload, max_bytes: int) -> tuple[str, str]:
+        """Copy the upload to a temp file chunk by chunk, hashing as it goes."""
+        hasher = hashlib.sha256()
+        fd, path = tempfile.mkstemp(prefix="upload-", dir=UPLOAD_SPOOL_DIR)
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UploadTooLarge(max_bytes)
+                    await asyncio.to_thread(_write_and_hash, out, hasher, chunk)
+        except BaseException:
+            await asyncio.to_thread(_remove_quietly, path)
+            raise
+        return path, hasher.hexdigest()
+
+    async def _run(self, path: str, filename: str) -> str:
+        loop = asyncio.get_running_loop()
+        if filename.lower().endswith('.pdf'):
+            return await loop.run_in_executor(self._get_pool(), _extract_pdf_text, path)
+        # Assume text/md
+        return await asyncio.to_thread(_decode_text, path)
+
+    def _cache_get(self, digest: str):
+        text = self._cache.get(digest)
+        if text is not None:
+            self._cache.move_to_end(digest)
+        return text
+
+    def _cache_put(self, digest: str, text: str):
+        if digest in self._cache or len(text) > self.max_cache_chars:
+            return
+        self._cache[digest] = text
+        self._cached_chars += len(text)
+        while self._cached_chars > self.max_cache_chars:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_chars -= len(evicted)
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+def _write_and_hash(out, hasher, chunk: bytes):
+    out.write(chunk)
+    hasher.update(chunk)
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,18 +1,129 @@
+import asyncio
+import hashlib
 import json
 import os
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 from openai import OpenAI
-from rich.console import Console
-from rich.status import Status
-from rich.panel import Panel
-from rich.syntax import Syntax
+from prompt_registry import PromptRegistry, PromptTemplate
+from cache import ResponseCache, SemanticCache, SEMANTIC_CACHE_ENABLED, make_cache_key
+from store import ScriptStore
+from providers import ProviderPool
+from presenters import Presenter, RichPresenter
+from scoring import Rubric, score_script
+from schemas import Segment, ScriptValidationError, segment_model, parse_script, parse_segment, complete_script
+
+# Keys that mark a JSON object as a script segment
+SEGMENT_FIELDS = ("scene_description", "voiceover", "on_screen_text")
+
+class SegmentStreamParser:
+    """Incrementally scan streamed JSON and yield segment objects as they close."""
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._pending_key = None
+        self._stack = []
+        self._count = 0
+
+    def feed(self, chunk: str) -> list[tuple[str, dict]]:
+        """Consume a chunk and return (key, segment) pairs completed by it."""
+        self.text += chunk
+        completed = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start + 1:i]
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ':':
+                self._pending_key = self._last_string
+            elif c == ',':
+                self._pending_key = None
+            elif c in '{[':
+                self._stack.append((i, self._pending_key))
+                self._pending_key = None
+            elif c in '}]' and self._stack:
+                begin, key = self._stack.pop()
+                # Only nested objects can be segments, never the root document
+                if c != '}' or not self._stack:
+                    continue
+                try:
+                    obj = json.loads(text[begin:i + 1])
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(obj, dict) and any(field in obj for field in SEGMENT_FIELDS):
+                    self._count += 1
+                    completed.append((key or f"segment_{self._count}", obj))
+        self._pos = len(text)
+        return completed
+
+# User-message templates, split once at import so requests only concatenate
+_REQUEST_TEMPLATE = """You are an elite Chef 
+                            and AI trainer helping to create social media content,
+                            practical chef food videos for a YouTube channel called PixelPlates.
+                            Generate a detailed educational JSON script based on the following request:
+                            
+                            REQUEST: {user_prompt}
+                            """
+_REFERENCE_TEMPLATE = """
+                            
+                            [REFERENCE MATERIAL START]
+                            {reference_content}
+                            [REFERENCE MATERIAL END]
+                            
+                            IMPORTANT: Use the above REFERENCE MATERIAL as the primary source for the recipe steps, ingredients, and style.
+                            """
+_USER_MESSAGE_SUFFIX = """
+                            The script will later be used to produce an AI-generated
+                            YouTube Short video using Veo 3.1."""
+_REQUEST_HEAD, _REQUEST_TAIL = _REQUEST_TEMPLATE.split("{user_prompt}")
+_REFERENCE_HEAD, _REFERENCE_TAIL = _REFERENCE_TEMPLATE.split("{reference_content}")
+
+# Targeted edit of one segment; only that segment comes back, so output tokens
+# scale with one segment instead of the whole script
+_SEGMENT_REWRITE_TEMPLATE = """You are editing one segment of an existing PixelPlates video script.
+
+ORIGINAL REQUEST: {user_prompt}
+
+FULL SCRIPT (for continuity; do not repeat it):
+{script}
+
+Rewrite ONLY "{segment_key}" ({time}). Keep the same character, tone and visual continuity with the
+segments before and after it, and follow every rule of the system prompt for a single segment.
+{instruction}
+Return a JSON object with exactly one key, "{segment_key}", whose value has the fields {fields}."""
+
+# Follow-up for output that local repair couldn't save; asks only for what is missing
+_COMPLETION_TEMPLATE = """Your previous reply was cut off or did not match the required format ({problem}).
+Do not repeat segments that are already complete. Return a JSON object containing only {keys},
+each with the fields {fields}, continuing the same script."""
+
+# Upper bound on in-flight provider calls per process for the async path
+MAX_CONCURRENT_GENERATIONS = int(os.getenv("MAX_CONCURRENT_GENERATIONS", "32"))
+# Whether a script that fails validation after local repair gets one targeted "complete this" call
+JSON_COMPLETION_FOLLOWUP = os.getenv("JSON_COMPLETION_FOLLOWUP", "true").lower() in ("1", "true", "yes")
 
 class ScriptGenerator:
-    def __init__(self, base_url: str, model: str, system_prompt_path: Path):
+    def __init__(self, base_url: str, model: str, system_prompt_path: Path, max_concurrency: int = MAX_CONCURRENT_GENERATIONS, cache: ResponseCache = None, prompt_registry: PromptRegistry = None, store: ScriptStore = None, providers: ProviderPool = None, presenter: Presenter = None):
         self.base_url = base_url
         self.model = model
-        self.console = Console()
+        self.temperature = 1.5
+        # Where progress and results go: Rich for the CLI, LogPresenter/SilentPresenter for servers
+        self.presenter = presenter if presenter is not None else RichPresenter()
         
         # Load API key
         load_dotenv(dotenv_path="apiKey.env")
@@ -20,133 +131,414 @@ class ScriptGenerator:
         if not self.api_key:
             raise ValueError("DEEPSEEK_API_KEY not found in apiKey.env")
 
-        # Initialize OpenAI client
+        # Sync client for the CLI; async calls go through the provider pool (deadlines, retries, hedging)
         self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        self.providers = providers if providers is not None else ProviderPool.from_env(self.base_url, self.model, self.api_key)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
 
-        # Load system prompt
+        # Exact-match response cache; pass a ResponseCache to share or relocate it
+        self.cache = cache if cache is not None else ResponseCache()
+        # Near-duplicate prompt matching, warmed from the persistent cache tier
+        self.semantic_cache = SemanticCache(self.cache) if SEMANTIC_CACHE_ENABLED else None
+
+        # Load system prompts once; the registry reloads them when files change
         self.system_prompt_path = system_prompt_path
-        if not self.system_prompt_path.exists():
-             raise FileNotFoundError(f"System prompt file not found: {self.system_prompt_path}")
-        
-        with open(self.system_prompt_path, mode='r', encoding='utf-8') as f:
-            self.system_prompt = f.read()
+        self.prompts = prompt_registry or PromptRegistry(system_prompt_path.parent)
+        self.prompts.get_path(self.system_prompt_path)
+        self._rubrics = {}
 
         # Setup output directory
         self.script_dir = Path.cwd() / "scripts"
         if not self.script_dir.exists():
             self.script_dir.mkdir(parents=True, exist_ok=True)
-            self.console.print(f"[green]Directory created successfully at {self.script_dir}[/green]")
+            self.presenter.info(f"Directory created successfully at {self.script_dir}")
         else:
-            self.console.print(f"[blue]Directory found at {self.script_dir}[/blue]")
+            self.presenter.info(f"Directory found at {self.script_dir}")
+        # Content-addressed script files, indexed by title/user
+        self.store = store if store is not None else ScriptStore(self.script_dir)
 
     @staticmethod
     def get_available_prompts(directory: Path = Path.cwd()) -> list[str]:
         """Scan for text files that look like prompts."""
         return [f.name for f in directory.glob("*.txt") if "prompt" in f.name]
 
+    @property
+    def system_prompt(self) -> str:
+        return self.prompts.get_path(self.system_prompt_path).content
+
     def _load_prompt(self, path: Path) -> str:
-        """Load prompt content from a file."""
-        if not path.exists():
-             raise FileNotFoundError(f"System prompt file not found: {path}")
-        with open(path, mode='r', encoding='utf-8') as f:
-            return f.read()
-
-    def generate_json_script(self, user_prompt: str, system_prompt_path: Path = None, reference_content: str = None) -> dict:
-        self.console.print(f"\n[bold yellow]Generating JSON script for:[/bold yellow] {user_prompt}")
-        if reference_content:
-            self.console.print(f"[dim]With reference content ({len(reference_content)} chars)[/dim]")
-        
-        # Determine which prompt to use
-        current_prompt = self.system_prompt
-        if system_prompt_path:
-            self.console.print(f"[dim]Using custom prompt: {system_prompt_path.name}[/dim]")
-            current_prompt = self._load_prompt(system_prompt_path)
-            
-        # Construct the user message
-        prompt_content = f"""You are an elite Chef 
-                            and AI trainer helping to create social media content,
-                            practical chef food videos for a YouTube channel called PixelPlates.
-                            Generate a detailed educational JSON script based on the following request:
-                            
-                            REQUEST: {user_prompt}
-                            """
-                            
+        """Load prompt content from the registry."""
+        return self.prompts.get_path(path).content
+
+    def _resolve_template(self, system_prompt_path: Path = None) -> PromptTemplate:
+        """Determine which prompt to use."""
+        return self.prompts.get_path(system_prompt_path or self.system_prompt_path)
+
+    def _rubric(self, template: PromptTemplate) -> Rubric:
+        """Scoring rubric for a prompt style, parsed once per prompt version."""
+        rubric = self._rubrics.get(template.sha256)
+        if rubric is None:
+            rubric = self._rubrics[template.sha256] = Rubric.from_prompt(template.content)
+        return rubric
+
+    def _segment_schema(self, template: PromptTemplate) -> type[Segment]:
+        """Pydantic segment model for a prompt style."""
+        return segment_model(template.name, template.content)
+
+    def _parse(self, content: str, template: PromptTemplate) -> tuple[dict, list[str]]:
+        """Validate model output, repairing it locally; raises ScriptValidationError."""
+        return parse_script(content, self._segment_schema(template), self._rubric(template))
+
+    def _completion_messages(self, messages: list[dict], content: str, error: ScriptValidationError, template: PromptTemplate) -> list[dict]:
+        keys = error.missing or list(self._rubric(template).segments)
+        fields = ", ".join(f'"{f}"' for f in self._segment_schema(template).model_fields)
+        return messages + [
+            {"role": "assistant", "content": content},
+            {"role": "user", "content": _COMPLETION_TEMPLATE.format(problem=error, keys=", ".join(f'"{k}"' for k in keys), fields=fields)}
+        ]
+
+    def _complete(self, error: ScriptValidationError, content: str, template: PromptTemplate) -> tuple[dict, list[str]]:
+        """Merge a completion follow-up into the partial script that failed validation."""
+        return complete_script(error.partial, error.missing, content, self._segment_schema(template), self._rubric(template))
+
+    async def _parse_or_complete(self, content: str, template: PromptTemplate, messages: list[dict], expires_at: float = None) -> tuple[dict, dict]:
+        """Validate and locally repair model output; only if that fails, ask the model to complete it.
+
+        Returns (script, info) where info records any local repairs and completed segments.
+        """
+        try:
+            script, repairs = self._parse(content, template)
+            return script, {"repairs": repairs} if repairs else {}
+        except ScriptValidationError as e:
+            if not JSON_COMPLETION_FOLLOWUP:
+                self.presenter.error("Failed to parse JSON response.", raw=content)
+                raise
+            error = e
+
+        self.presenter.warning(f"{error}; requesting completion")
+        async with self._semaphore:
+            followup = await self.providers.complete(
+                deadline=None if expires_at is None else max(0.0, expires_at - time.monotonic()),
+                messages=self._completion_messages(messages, content, error, template),
+                temperature=self.temperature,
+                response_format={'type': 'json_object'}
+            )
+        try:
+            script, repairs = self._complete(error, followup, template)
+        except ScriptValidationError:
+            self.presenter.error("Failed to parse JSON response.", raw=followup)
+            raise
+        info = {"completed": error.missing}
+        if repairs:
+            info["repairs"] = repairs
+        return script, info
+
+    def _build_messages(self, user_prompt: str, template: PromptTemplate, reference_content: str = None) -> list[dict]:
+        """Build the chat messages for a JSON script request."""
+        parts = [_REQUEST_HEAD, user_prompt, _REQUEST_TAIL]
         if reference_content:
-            prompt_content += f"""
-                            
-                            [REFERENCE MATERIAL START]
-                            {reference_content}
-                            [REFERENCE MATERIAL END]
-                            
-                            IMPORTANT: Use the above REFERENCE MATERIAL as the primary source for the recipe steps, ingredients, and style.
-                            """
-                            
-        prompt_content += """
-                            The script will later be used to produce an AI-generated
-                            YouTube Short video using Veo 3.1."""
+            parts += [_REFERENCE_HEAD, reference_content, _REFERENCE_TAIL]
+        parts.append(_USER_MESSAGE_SUFFIX)
+
+        return [
+            {"role": "system", "content": template.content},
+            {"role": "user", "content": "".join(parts)}
+        ]
+
+    def save_script(self, json_res: dict, user_prompt: str, user_id: int = None) -> Path:
+        """Write a generated script to the content-addressed store and return its blob path."""
+        title = user_prompt.strip()[:30] or "generated_script"
+        _, output_file = self.store.put(json_res, title=title, prompt=user_prompt, user_id=user_id)
+        return output_file
 
+    def _cache_key(self, template: PromptTemplate, user_prompt: str, reference_content: str = None) -> str:
+        return make_cache_key(self.model, template.sha256, user_prompt, reference_content, self.temperature)
+
+    def _cache_put(self, key: str, json_res: dict, template: PromptTemplate, user_prompt: str, reference_content: str = None):
+        reference_hash = hashlib.sha256(reference_content.encode('utf-8')).hexdigest() if reference_content else None
+        style_hash = template.sha256
         try:
-            with self.console.status("[bold green]Thinking...[/bold green]", spinner="dots"):
+            self.cache.put(key, json_res, model=self.model, style_hash=style_hash, prompt=user_prompt, reference_hash=reference_hash)
+            # Reference-backed scripts depend on the upload, so only plain prompts are semantically reusable
+            if self.semantic_cache is not None and reference_hash is None:
+                self.semantic_cache.add(style_hash, user_prompt, key)
+        except Exception as e:
+            # A broken cache must never fail a generation
+            self.presenter.warning(f"failed to write response cache: {e}")
+
+    def _semantic_get(self, template: PromptTemplate, user_prompt: str):
+        """Return (script, similarity) for a stored near-duplicate prompt, else (None, None)."""
+        if self.semantic_cache is None:
+            return None, None
+        try:
+            key, similarity = self.semantic_cache.lookup(template.sha256, user_prompt)
+            if key is None:
+                return None, None
+            cached = self.cache.get(key)
+            return (cached, similarity) if cached is not None else (None, None)
+        except Exception as e:
+            self.presenter.warning(f"failed to read semantic cache: {e}")
+            return None, None
+
+    def _cache_get(self, key: str):
+        try:
+            return self.cache.get(key)
+        except Exception as e:
+            self.presenter.warning(f"failed to read response cache: {e}")
+            return None
+
+    def generate_json_script(self, user_prompt: str, system_prompt_path: Path = None, reference_content: str = None, use_cache: bool = True) -> dict:
+        self.presenter.generation_started(
+            "JSON", user_prompt,
+            reference_chars=len(reference_content) if reference_content else None,
+            prompt_name=system_prompt_path.name if system_prompt_path else None
+        )
+
+        template = self._resolve_template(system_prompt_path)
+        messages = self._build_messages(user_prompt, template, reference_content)
+        cache_key = self._cache_key(template, user_prompt, reference_content)
+        if use_cache:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self.presenter.cache_hit()
+                return cached
+
+        try:
+            with self.presenter.thinking():
                 response = self.client.chat.completions.create(
                     model=self.model,
-                    messages=[
-                        {"role": "system", "content": current_prompt},
-                        {"role": "user", "content": prompt_content}
-                    ],
-                    temperature=1.5,
+                    messages=messages,
+                    temperature=self.temperature,
                     response_format={'type': 'json_object'}
                 )
                 
                 content = response.choices[0].message.content
             
-            self.console.print("[bold green]Response received![/bold green]")
+            self.presenter.response_received()
             
-            # Parse and save JSON
+            # Validate (repairing locally if needed) and save
             try:
-                json_res = json.loads(content)
-                
-                # Simple sanitization for filename
-                safe_title = "".join([c for c in user_prompt if c.isalnum() or c in (' ', '-', '_')]).strip()[:30]
-                if not safe_title:
-                    safe_title = "generated_script"
-                
-                output_file = self.script_dir / f"{safe_title}.json"
+                try:
+                    json_res, repairs = self._parse(content, template)
+                except ScriptValidationError as e:
+                    if not JSON_COMPLETION_FOLLOWUP:
+                        raise
+                    self.presenter.warning(f"{e}; requesting completion")
+                    with self.presenter.thinking():
+                        response = self.client.chat.completions.create(
+                            model=self.model,
+                            messages=self._completion_messages(messages, content, e, template),
+                            temperature=self.temperature,
+                            response_format={'type': 'json_object'}
+                        )
+                    content = response.choices[0].message.content
+                    json_res, repairs = self._complete(e, content, template)
+                if repairs:
+                    self.presenter.info(f"Repaired model output locally: {', '.join(repairs)}")
+                self._cache_put(cache_key, json_res, template, user_prompt, reference_content)
+                output_file = self.save_script(json_res, user_prompt)
                 
-                with open(output_file, 'w', encoding='utf-8') as file:
-                    json.dump(json_res, file, indent=4)
-                
-                self.console.print(f"[bold green]Script saved to:[/bold green] {output_file}")
-                
-                # Print formatted JSON
-                json_str = json.dumps(json_res, indent=4)
-                syntax = Syntax(json_str, "json", theme="monokai", line_numbers=True)
-                self.console.print(Panel(syntax, title="Generated Script", border_style="green"))
+                self.presenter.script_saved(output_file)
+                self.presenter.script_ready(json_res)
                 
                 return json_res
 
-            except json.JSONDecodeError:
-                self.console.print("[bold red]Error: Failed to parse JSON response.[/bold red]")
-                self.console.print(f"Raw response: {content}")
+            except ScriptValidationError:
+                self.presenter.error("Failed to parse JSON response.", raw=content)
                 raise
             except Exception as e:
-                self.console.print(f"[bold red]Error saving file: {e}[/bold red]")
+                self.presenter.error(f"Error saving file: {e}")
                 raise
 
         except Exception as e:
-            self.console.print(f"[bold red]API Request failed: {e}[/bold red]")
+            self.presenter.error(f"API Request failed: {e}")
+            raise
+
+    async def generate_json_script_async(self, user_prompt: str, system_prompt_path: Path = None, reference_content: str = None, use_cache: bool = True, save: bool = True, deadline: float = None) -> dict:
+        """Non-blocking variant of generate_json_script for use on an event loop."""
+        json_res, _ = await self.generate_json_script_with_meta(user_prompt, system_prompt_path, reference_content, use_cache, save, deadline)
+        return json_res
+
+    async def generate_json_script_with_meta(self, user_prompt: str, system_prompt_path: Path = None, reference_content: str = None, use_cache: bool = True, save: bool = True, deadline: float = None) -> tuple[dict, dict]:
+        """Generate a script and return it with metadata about how it was produced.
+
+        Pass save=False when the caller persists the script itself (e.g. via ScriptWriter),
+        and `deadline` (seconds) to bound the provider call by the caller's budget.
+        """
+        started = time.perf_counter()
+        template = self._resolve_template(system_prompt_path)
+        messages = self._build_messages(user_prompt, template, reference_content)
+        cache_key = self._cache_key(template, user_prompt, reference_content)
+
+        if use_cache:
+            cached = await asyncio.to_thread(self._cache_get, cache_key)
+            if cached is not None:
+                return cached, {"cache": "hit", "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+            if not reference_content:
+                cached, similarity = await asyncio.to_thread(self._semantic_get, template, user_prompt)
+                if cached is not None:
+                    return cached, {
+                        "cache": "semantic",
+                        "similarity": round(similarity, 4),
+                        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+                    }
+
+        # Cap concurrent provider calls so one worker can't exhaust the quota
+        expires_at = None if deadline is None else time.monotonic() + deadline
+        async with self._semaphore:
+            content = await self.providers.complete(
+                deadline=deadline,
+                messages=messages,
+                temperature=self.temperature,
+                response_format={'type': 'json_object'}
+            )
+        json_res, repair_info = await self._parse_or_complete(content, template, messages, expires_at)
+
+        # Keep the cache and file writes off the event loop
+        await asyncio.to_thread(self._cache_put, cache_key, json_res, template, user_prompt, reference_content)
+        if save:
+            output_file = await asyncio.to_thread(self.save_script, json_res, user_prompt)
+            self.presenter.script_saved(output_file)
+        return json_res, {"cache": "miss" if use_cache else "bypass", "elapsed_ms": round((time.perf_counter() - started) * 1000, 2), **repair_info}
+
+    async def generate_candidates(self, user_prompt: str, system_prompt_path: Path = None, reference_content: str = None, n: int = 3, save: bool = True, deadline: float = None) -> tuple[list[dict], dict]:
+        """Request n scripts concurrently and rank them locally, best first.
+
+        Each candidate is {"script", "score", "report"} as scored by scoring.score_script
+        against the prompt's own structure and pacing rules. Candidates that fail or don't
+        parse are dropped; only if all of them fail is the last error raised. The cache is
+        not consulted (the point is fresh variety), but the best script is cached and saved.
+        Candidates are repaired locally but never completed with a follow-up call; the
+        others already stand in for a failed one.
+        """
+        started = time.perf_counter()
+        template = self._resolve_template(system_prompt_path)
+        messages = self._build_messages(user_prompt, template, reference_content)
+        rubric = self._rubric(template)
+
+        async def candidate() -> dict:
+            async with self._semaphore:
+                content = await self.providers.complete(
+                    deadline=deadline,
+                    messages=messages,
+                    temperature=self.temperature,
+                    response_format={'type': 'json_object'}
+                )
+            try:
+                script, repairs = self._parse(content, template)
+            except ScriptValidationError:
+                self.presenter.error("Failed to parse JSON response.", raw=content)
+                raise
+            score, report = score_script(script, rubric)
+            if repairs:
+                report["repairs"] = repairs
+            return {"script": script, "score": score, "report": report}
+
+        results = await asyncio.gather(*(candidate() for _ in range(n)), return_exceptions=True)
+        candidates = [r for r in results if not isinstance(r, BaseException)]
+        if not candidates:
+            raise results[-1]
+        candidates.sort(key=lambda c: c["score"], reverse=True)
+        best = candidates[0]["script"]
+
+        cache_key = self._cache_key(template, user_prompt, reference_content)
+        await asyncio.to_thread(self._cache_put, cache_key, best, template, user_prompt, reference_content)
+        if save:
+            output_file = await asyncio.to_thread(self.save_script, best, user_prompt)
+            self.presenter.script_saved(output_file)
+        return candidates, {
+            "cache": "bypass",
+            "candidates": n,
+            "failed": n - len(candidates),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    async def regenerate_segment(self, script: dict, segment_key: str, user_prompt: str, system_prompt_path: Path = None, instruction: str = None, deadline: float = None) -> dict:
+        """Regenerate one segment of an existing script and return the new segment.
+
+        Only the requested segment is generated; the rest of the script is sent as context.
+        The segment keeps its original time slot.
+        """
+        template = self._resolve_template(system_prompt_path)
+        original = script[segment_key]
+        fields = ", ".join(f'"{field}"' for field in original) or ", ".join(f'"{f}"' for f in ("time",) + SEGMENT_FIELDS)
+        request = _SEGMENT_REWRITE_TEMPLATE.format(
+            user_prompt=user_prompt,
+            script=json.dumps(script, ensure_ascii=False, separators=(',', ':')),
+            segment_key=segment_key,
+            time=original.get("time", ""),
+            instruction=f"Specific change requested: {instruction}\n" if instruction else "",
+            fields=fields,
+        )
+        messages = [
+            {"role": "system", "content": template.content},
+            {"role": "user", "content": request}
+        ]
+
+        async with self._semaphore:
+            content = await self.providers.complete(
+                deadline=deadline,
+                messages=messages,
+                temperature=self.temperature,
+                response_format={'type': 'json_object'}
+            )
+        try:
+            return parse_segment(content, segment_key, self._segment_schema(template), time=original.get("time"))
+        except ScriptValidationError:
+            self.presenter.error("Failed to parse JSON response.", raw=content)
             raise
 
+    async def stream_json_script(self, user_prompt: str, system_prompt_path: Path = None, reference_content: str = None, use_cache: bool = True, save: bool = True, deadline: float = None):
+        """Stream a JSON script, yielding ("segment", key, segment) as each closes and ("done", meta, script) at the end."""
+        template = self._resolve_template(system_prompt_path)
+        messages = self._build_messages(user_prompt, template, reference_content)
+        cache_key = self._cache_key(template, user_prompt, reference_content)
+
+        if use_cache:
+            meta = {"cache": "hit"}
+            cached = await asyncio.to_thread(self._cache_get, cache_key)
+            if cached is None and not reference_content:
+                cached, similarity = await asyncio.to_thread(self._semantic_get, template, user_prompt)
+                meta = {"cache": "semantic", "similarity": round(similarity, 4) if similarity else None}
+            if cached is not None:
+                # Replay the cached script through the parser so hits stream the same way
+                for key, segment in SegmentStreamParser().feed(json.dumps(cached)):
+                    yield "segment", key, segment
+                yield "done", meta, cached
+                return
+
+        parser = SegmentStreamParser()
+        expires_at = None if deadline is None else time.monotonic() + deadline
+
+        async with self._semaphore:
+            async for delta in self.providers.stream(
+                deadline=deadline,
+                messages=messages,
+                temperature=self.temperature,
+                response_format={'type': 'json_object'}
+            ):
+                for key, segment in parser.feed(delta):
+                    yield "segment", key, segment
+
+        # Segments already sent are previews; the "done" event carries the validated script
+        json_res, repair_info = await self._parse_or_complete(parser.text, template, messages, expires_at)
+
+        await asyncio.to_thread(self._cache_put, cache_key, json_res, template, user_prompt, reference_content)
+        if save:
+            output_file = await asyncio.to_thread(self.save_script, json_res, user_prompt)
+            self.presenter.script_saved(output_file)
+        yield "done", {"cache": "miss" if use_cache else "bypass", **repair_info}, json_res
+
     def generate_text_script(self, user_prompt: str, system_prompt_path: Path = None) -> str:
-        self.console.print(f"\n[bold yellow]Generating text script for:[/bold yellow] {user_prompt}")
+        self.presenter.generation_started("text", user_prompt, prompt_name=system_prompt_path.name if system_prompt_path else None)
         
         # Determine which prompt to use
         current_prompt = self.system_prompt
         if system_prompt_path:
-            self.console.print(f"[dim]Using custom prompt: {system_prompt_path.name}[/dim]")
             current_prompt = self._load_prompt(system_prompt_path)
             
         try:
-            with self.console.status("[bold green]Thinking...[/bold green]", spinner="dots"):
+            with self.presenter.thinking():
                 response = self.client.chat.completions.create(
                     model=self.model,
                     messages=[
@@ -158,15 +550,15 @@ class ScriptGenerator:
                             The script will later be used to produce an AI-generated
                             YouTube Short video using Veo 3.1."""}
                     ],
-                    temperature=1.5,
+                    temperature=self.temperature,
                     response_format={'type': 'text'}
                 )
                 
                 content = response.choices[0].message.content
             
-            self.console.print(Panel(content, title="Generated Script", border_style="blue"))
+            self.presenter.text_ready(content)
             return content
             
         except Exception as e:
-            self.console.print(f"[bold red]API Request failed: {e}[/bold red]")
+            self.presenter.error(f"API Request failed: {e}")
             raise
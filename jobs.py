@@ -0,0 +1,331 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import or_, and_, func
+from database import SessionLocal
+from models import Job, Script
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# A running job whose worker has been silent this long is assumed dead and re-queued
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+# How often a worker renews the lease of the job it is running
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", str(JOB_LEASE_SECONDS / 4)))
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+def job_to_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "script_id": job.script_id,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+class JobQueue:
+    """Durable generation queue backed by the jobs table.
+
+    Any object with an async generate_json_script_async(prompt, system_prompt_path,
+    reference_content) can be used as the generator, so tests can pass an
+    in-process fake LLM together with a session factory for a throwaway database.
+    When a scheduler is given, each generation waits for a fair-queued slot
+    under the job's user (submission is expected to have been admitted already).
+    """
+
+    def __init__(self, generator, session_factory=SessionLocal, num_workers: int = JOB_WORKERS,
+                 poll_interval: float = 2.0, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 lease_seconds: int = JOB_LEASE_SECONDS, heartbeat_seconds: float = JOB_HEARTBEAT_SECONDS,
+                 scheduler=None):
+        self.generator = generator
+        self.scheduler = scheduler
+        self.session_factory = session_factory
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = min(heartbeat_seconds, lease_seconds / 2)
+        self._wakeup = asyncio.Event()
+        self._loop = None
+        self._workers = []
+        # Jobs claimed by workers that stop() cancelled; handed back to the queue
+        self._interrupted = []
+
+    def _notify(self):
+        """Wake an idle worker. submit() and _fail() run in worker threads, so hop onto the loop."""
+        if self._loop is None or self._loop.is_closed():
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def submit(self, prompt: str, user_id, prompt_file: str = None, reference_content: str = None,
+               input_filename: str = None, generation_type: str = "text") -> dict:
+        """Persist a new job and wake a worker. Returns the job as a dict."""
+        db = self.session_factory()
+        try:
+            job = Job(
+                id=uuid.uuid4().hex,
+                status="queued",
+                prompt=prompt,
+                prompt_file=prompt_file,
+                reference_content=reference_content,
+                input_filename=input_filename,
+                generation_type=generation_type,
+                user_id=user_id,
+                attempts=0,
+                created_at=datetime.utcnow()
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            result = job_to_dict(job)
+        finally:
+            db.close()
+        self._notify()
+        return result
+
+    def get(self, job_id: str, user_id) -> dict:
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id, Job.user_id == user_id).first()
+            return job_to_dict(job) if job else None
+        finally:
+            db.close()
+
+    def start(self):
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        for n in range(self.num_workers):
+            self._workers.append(asyncio.create_task(self._worker(n)))
+
+    async def stop(self):
+        """Cancel the workers and hand their running jobs back to the queue for the next process."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        interrupted, self._interrupted = self._interrupted, []
+        for job in interrupted:
+            try:
+                await asyncio.to_thread(self._requeue, job)
+            except Exception as e:
+                print(f"Job {job['id']}: failed to requeue on shutdown: {e}")
+
+    async def _worker(self, n: int):
+        while True:
+            claim = asyncio.ensure_future(asyncio.to_thread(self._claim))
+            try:
+                job = await asyncio.shield(claim)
+            except asyncio.CancelledError:
+                # The claim commits in its thread regardless; don't leave what it took marked running
+                claimed, = await asyncio.gather(claim, return_exceptions=True)
+                if isinstance(claimed, dict):
+                    self._interrupted.append(claimed)
+                raise
+            except Exception as e:
+                print(f"Job worker {n}: failed to claim job: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            await self._run(job)
+
+    def _claim(self):
+        """Atomically move the oldest runnable job to 'running' and return its inputs.
+
+        A job whose lease expired after its last allowed attempt is failed instead.
+        """
+        db = self.session_factory()
+        try:
+            while True:
+                now = datetime.utcnow()
+                stale = now - timedelta(seconds=self.lease_seconds)
+                query = db.query(Job).filter(or_(
+                    Job.status == "queued",
+                    # Jobs orphaned by a crashed or restarted worker
+                    and_(Job.status == "running", func.coalesce(Job.heartbeat_at, Job.started_at) < stale)
+                )).order_by(Job.created_at)
+                if db.bind is not None and db.bind.dialect.name == "postgresql":
+                    query = query.with_for_update(skip_locked=True)
+                job = query.first()
+                if job is None:
+                    return None
+
+                exhausted = (job.attempts or 0) >= self.max_attempts
+                if exhausted:
+                    values = {
+                        Job.status: "failed",
+                        Job.error: f"Worker lost after {job.attempts} attempt(s)",
+                        Job.finished_at: now
+                    }
+                else:
+                    values = {
+                        Job.status: "running",
+                        Job.started_at: now,
+                        Job.heartbeat_at: now,
+                        Job.attempts: (job.attempts or 0) + 1
+                    }
+                # Conditional update so two workers can never both claim the job,
+                # even on databases without SKIP LOCKED
+                claimed = db.query(Job).filter(
+                    Job.id == job.id,
+                    Job.status == job.status,
+                    Job.attempts == job.attempts
+                ).update(values, synchronize_session=False)
+                db.commit()
+                if not claimed:
+                    return None
+                if exhausted:
+                    print(f"Job {job.id} failed: worker lost after {job.attempts} attempt(s)")
+                    continue
+                break
+            db.refresh(job)
+            return {
+                "id": job.id,
+                "prompt": job.prompt,
+                "prompt_file": job.prompt_file,
+                "reference_content": job.reference_content,
+                "input_filename": job.input_filename,
+                "generation_type": job.generation_type,
+                "user_id": job.user_id,
+                "attempts": job.attempts,
+            }
+        finally:
+            db.close()
+
+    async def _generate(self, job: dict) -> dict:
+        system_prompt_path = Path.cwd() / job["prompt_file"] if job["prompt_file"] else None
+        if self.scheduler is not None:
+            async with self.scheduler.slot(job["user_id"], admit=False):
+                return await self.generator.generate_json_script_async(
+                    job["prompt"], system_prompt_path, job["reference_content"]
+                )
+        return await self.generator.generate_json_script_async(
+            job["prompt"], system_prompt_path, job["reference_content"]
+        )
+
+    async def _heartbeat(self, job: dict, generation: asyncio.Task):
+        """Renew the job's lease while it runs; cancel the run if another worker took it over."""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                renewed = await asyncio.to_thread(self._renew, job)
+            except Exception as e:
+                print(f"Job {job['id']}: failed to renew lease: {e}")
+                continue
+            if not renewed:
+                job["lease_lost"] = True
+                generation.cancel()
+                return
+
+    async def _run(self, job: dict):
+        generation = asyncio.ensure_future(self._generate(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job, generation))
+        try:
+            result = await generation
+        except asyncio.CancelledError:
+            if not job.get("lease_lost"):
+                # Shutting down: stop() puts the job back in the queue
+                self._interrupted.append(job)
+                raise
+            print(f"Job {job['id']} lost its lease; abandoning attempt {job['attempts']}")
+            return
+        except Exception as e:
+            print(f"Job {job['id']} failed (attempt {job['attempts']}): {e}")
+            await asyncio.to_thread(self._fail, job, str(e))
+            return
+        finally:
+            heartbeat.cancel()
+
+        await asyncio.to_thread(self._complete, job, result)
+
+    def _owned(self, db, job: dict):
+        """The job row, if this attempt still holds its lease."""
+        return db.query(Job).filter(
+            Job.id == job["id"],
+            Job.status == "running",
+            Job.attempts == job["attempts"]
+        )
+
+    def _renew(self, job: dict) -> bool:
+        db = self.session_factory()
+        try:
+            renewed = self._owned(db, job).update({Job.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+            return bool(renewed)
+        finally:
+            db.close()
+
+    def _requeue(self, job: dict):
+        """Put a job interrupted by shutdown back in the queue; the interrupted attempt doesn't count."""
+        db = self.session_factory()
+        try:
+            requeued = self._owned(db, job).update({
+                Job.status: "queued",
+                Job.attempts: job["attempts"] - 1,
+                Job.heartbeat_at: None
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        if requeued:
+            print(f"Job {job['id']} requeued on shutdown")
+
+    def _complete(self, job: dict, result: dict):
+        db = self.session_factory()
+        try:
+            db_job = self._owned(db, job).first()
+            if db_job is None:
+                print(f"Job {job['id']} was taken over by another worker; discarding attempt {job['attempts']}")
+                return
+            db_script = Script(
+                title=job["prompt"][:30],
+                prompt=job["prompt"],
+                prompt_file=job["prompt_file"],
+                content=result,
+                generation_type=job["generation_type"],
+                input_filename=job["input_filename"],
+                user_id=job["user_id"]
+            )
+            db.add(db_script)
+            db.flush()
+
+            db_job.status = "succeeded"
+            db_job.script_id = db_script.id
+            db_job.error = None
+            db_job.finished_at = datetime.utcnow()
+            # The reference text is only needed until the job has run
+            db_job.reference_content = None
+            db.commit()
+        finally:
+            db.close()
+
+    def _fail(self, job: dict, error: str):
+        db = self.session_factory()
+        try:
+            db_job = self._owned(db, job).first()
+            if db_job is None:
+                return
+            db_job.error = error
+            if job["attempts"] >= self.max_attempts:
+                db_job.status = "failed"
+                db_job.finished_at = datetime.utcnow()
+            else:
+                db_job.status = "queued"
+            db.commit()
+        finally:
+            db.close()
+        if job["attempts"] < self.max_attempts:
+            self._notify()
@@ -0,0 +1,169 @@
+import json
+import re
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_CLOSERS = {"{": "}", "[": "]"}
+_DECODER = json.JSONDecoder()
+
+def _strip_fences(text: str) -> str:
+    """Drop markdown code fences and anything before the first brace."""
+    text = _FENCE_RE.sub("", text)
+    start = text.find("{")
+    return text[start:] if start > 0 else text
+
+def _strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing brace/bracket, outside of strings."""
+    out = []
+    in_string = escape = False
+    pending_comma = None
+    for c in text:
+        if in_string:
+            out.append(c)
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+            continue
+        if pending_comma is not None:
+            if c.isspace():
+                pending_comma.append(c)
+                continue
+            if c not in "}]":
+                out.append(",")
+            out.extend(pending_comma)
+            pending_comma = None
+        if c == ",":
+            pending_comma = []
+            continue
+        if c == '"':
+            in_string = True
+        out.append(c)
+    if pending_comma is not None:
+        out.append(",")
+        out.extend(pending_comma)
+    return "".join(out)
+
+def _close_truncated(text: str) -> str:
+    """Cut a truncated document back to its last complete value and close the open containers."""
+    stack = []
+    in_string = escape = string_is_key = False
+    last_significant = ""
+    safe_end, safe_stack = 0, []
+    for i, c in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+                if not string_is_key:
+                    safe_end, safe_stack = i + 1, stack[:]
+                last_significant = '"'
+            continue
+        if c.isspace():
+            continue
+        if c == '"':
+            in_string = True
+            string_is_key = bool(stack) and stack[-1] == "{" and last_significant in ("{", ",")
+        elif c in "{[":
+            stack.append(c)
+            safe_end, safe_stack = i + 1, stack[:]
+        elif c in "}]":
+            if stack:
+                stack.pop()
+            safe_end, safe_stack = i + 1, stack[:]
+        elif c not in ",:":
+            # Numbers and literals are complete once a delimiter follows them
+            following = text[i + 1:i + 2]
+            if following and (following in ",}]" or following.isspace()):
+                safe_end, safe_stack = i + 1, stack[:]
+        last_significant = c
+
+    if not in_string and not stack:
+        return text
+    head = text[:safe_end].rstrip()
+    if head.endswith(","):
+        head = head[:-1]
+    return head + "".join(_CLOSERS[b] for b in reversed(safe_stack))
+
+def repair_json(text: str) -> tuple[object, list[str]]:
+    """Parse model output, applying cheap syntactic repairs only as needed.
+
+    Returns (value, repairs) where `repairs` names the fixes that were applied.
+    Raises json.JSONDecodeError if the text is still unparseable.
+    """
+    try:
+        return json.loads(text), []
+    except json.JSONDecodeError:
+        pass
+
+    repairs = []
+    candidate = _strip_fences(text)
+    if candidate.strip() != text.strip():
+        repairs.append("fences")
+    without_commas = _strip_trailing_commas(candidate)
+    if without_commas != candidate:
+        repairs.append("trailing_commas")
+    candidate = without_commas
+    try:
+        value, end = _DECODER.raw_decode(candidate)
+        if candidate[end:].strip():
+            repairs.append("trailing_text")
+        return value, repairs
+    except json.JSONDecodeError:
+        pass
+
+    closed = _close_truncated(candidate)
+    if closed != candidate:
+        repairs.append("truncation")
+    return json.loads(closed), repairs
+
+def _normalize_key(key: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", str(key).lower()).strip("_")
+
+_SEGMENT_KEY_RE = re.compile(r"^(?:segment|seg|part|scene|shot)_?(\d+)$")
+
+def normalize_segment_keys(segment: dict, aliases: dict) -> dict:
+    """Rename aliased segment fields (e.g. 'narration' -> 'voiceover'); the first spelling found wins."""
+    result = {}
+    for key, value in segment.items():
+        name = aliases.get(_normalize_key(key), key)
+        if name not in result:
+            result[name] = value
+    return result
+
+def normalize_script(data, aliases: dict) -> tuple[object, list[str]]:
+    """Bring common structural variants into the segment_N shape.
+
+    Handles a wrapping {"script": ...}/{"segments": ...} object, a bare list of
+    segments, 'Segment 1'-style keys and aliased field names.
+    Returns (script, repairs).
+    """
+    repairs = []
+    if isinstance(data, dict) and len(data) == 1:
+        (only_key, only_value), = data.items()
+        if _normalize_key(only_key) in ("script", "segments", "video_script", "output") and isinstance(only_value, (dict, list)):
+            data = only_value
+            repairs.append("unwrapped")
+    if isinstance(data, list):
+        data = {f"segment_{i}": item for i, item in enumerate(data, 1)}
+        repairs.append("list_to_segments")
+    if not isinstance(data, dict):
+        return data, repairs
+
+    script = {}
+    for key, value in data.items():
+        match = _SEGMENT_KEY_RE.match(_normalize_key(key))
+        name = f"segment_{int(match.group(1))}" if match else key
+        if name != key:
+            repairs.append("segment_keys")
+        if isinstance(value, dict):
+            renamed = normalize_segment_keys(value, aliases)
+            if list(renamed) != list(value):
+                repairs.append("field_aliases")
+            value = renamed
+        script.setdefault(name, value)
+    return script, sorted(set(repairs), key=repairs.index)
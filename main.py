@@ -1,126 +1,168 @@
+import argparse
+import asyncio
 import json
-import os
+import time
 from pathlib import Path
-from dotenv import load_dotenv
-from openai import OpenAI
 from rich.console import Console
-from rich.status import Status
-from rich.panel import Panel
-from rich.syntax import Syntax
-
-class ScriptGenerator:
-    def __init__(self, base_url: str, model: str, system_prompt_path: Path):
-        self.base_url = base_url
-        self.model = model
-        self.console = Console()
-        
-        # Load API key
-        load_dotenv(dotenv_path="apiKey.env")
-        self.api_key = os.getenv("DEEPSEEK_API_KEY")
-        if not self.api_key:
-            raise ValueError("DEEPSEEK_API_KEY not found in apiKey.env")
-
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
-
-        # Load system prompt
-        self.system_prompt_path = system_prompt_path
-        if not self.system_prompt_path.exists():
-             raise FileNotFoundError(f"System prompt file not found: {self.system_prompt_path}")
-        
-        with open(self.system_prompt_path, mode='r', encoding='utf-8') as f:
-            self.system_prompt = f.read()
-
-        # Setup output directory
-        self.script_dir = Path.cwd() / "scripts"
-        if not self.script_dir.exists():
-            self.script_dir.mkdir(parents=True, exist_ok=True)
-            self.console.print(f"[green]Directory created successfully at {self.script_dir}[/green]")
-        else:
-            self.console.print(f"[blue]Directory found at {self.script_dir}[/blue]")
-
-    def generate_json_script(self, user_prompt: str):
-        self.console.print(f"\n[bold yellow]Generating JSON script for:[/bold yellow] {user_prompt}")
-        
-        try:
-            with self.console.status("[bold green]Thinking...[/bold green]", spinner="dots"):
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": self.system_prompt},
-                        {"role": "user", "content": f"""You are an elite Chef 
-                            and AI trainer helping to create social media content,
-                            practical chef food videos for a YouTube channel called PixelPlates.
-                            Generate a detailed educational JSON script based on the {user_prompt} 
-                            I provide. 
-                            The script will later be used to produce an AI-generated
-                            YouTube Short video using Veo 3.1."""}
-                    ],
-                    temperature=1.5,
-                    response_format={'type': 'json_object'}
-                )
-                
-                content = response.choices[0].message.content
-            
-            self.console.print("[bold green]Response received![/bold green]")
-            
-            # Parse and save JSON
-            try:
-                json_res = json.loads(content)
-                
-                # Simple sanitization for filename
-                safe_title = "".join([c for c in user_prompt if c.isalnum() or c in (' ', '-', '_')]).strip()[:30]
-                if not safe_title:
-                    safe_title = "generated_script"
-                
-                output_file = self.script_dir / f"{safe_title}.json"
-                
-                with open(output_file, 'w', encoding='utf-8') as file:
-                    json.dump(json_res, file, indent=4)
-                
-                self.console.print(f"[bold green]Script saved to:[/bold green] {output_file}")
-                
-                # Print formatted JSON
-                json_str = json.dumps(json_res, indent=4)
-                syntax = Syntax(json_str, "json", theme="monokai", line_numbers=True)
-                self.console.print(Panel(syntax, title="Generated Script", border_style="green"))
+from generator import ScriptGenerator
 
+class RateLimiter:
+    """Space out calls so no more than `rate` start per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+def _load_completed(results_path: Path) -> set[str]:
+    """Ids already generated successfully in a previous run."""
+    completed = set()
+    if not results_path.exists():
+        return completed
+    with open(results_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
             except json.JSONDecodeError:
-                self.console.print("[bold red]Error: Failed to parse JSON response.[/bold red]")
-                self.console.print(f"Raw response: {content}")
+                # A partially written last line from an interrupted run
+                continue
+            if record.get("status") == "ok":
+                completed.add(record["id"])
+    return completed
+
+def _iter_requests(batch_path: Path):
+    """Lazily yield (id, prompt, prompt_file, error) from a JSONL file.
+
+    Lines that aren't a JSON object with a "prompt" come back with an error
+    message instead of aborting the batch.
+    """
+    with open(batch_path, 'r', encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield f"line-{lineno}", None, None, f"invalid JSON: {e}"
+                continue
+            if not isinstance(request, dict):
+                yield f"line-{lineno}", None, None, "request is not a JSON object"
+                continue
+            request_id = str(request.get("id") or request.get("request_id") or f"line-{lineno}")
+            prompt = request.get("prompt")
+            if not prompt:
+                yield request_id, None, request.get("prompt_file"), "missing \"prompt\""
+                continue
+            yield request_id, prompt, request.get("prompt_file"), None
+
+async def run_batch(generator: ScriptGenerator, batch_path: Path, results_path: Path,
+                    parallelism: int = 4, rate: float = 0.0, console: Console = None) -> dict:
+    """Generate every request in a JSONL file concurrently, appending results as they finish."""
+    console = console or Console()
+    completed = _load_completed(results_path)
+    limiter = RateLimiter(rate)
+    # Bounded so the input file is streamed rather than read up front
+    queue = asyncio.Queue(maxsize=parallelism * 2)
+    stats = {"ok": 0, "error": 0, "skipped": 0}
+
+    results_file = open(results_path, 'a', encoding='utf-8')
+
+    def write_result(record: dict):
+        # Write and flush each result so an interrupted run can resume
+        results_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        results_file.flush()
+
+    async def producer():
+        for request_id, prompt, prompt_file, error in _iter_requests(batch_path):
+            if request_id in completed:
+                stats["skipped"] += 1
+                continue
+            if error:
+                stats["error"] += 1
+                console.print(f"[red]✗[/red] {request_id}: {error}")
+                write_result({"id": request_id, "prompt": prompt, "prompt_file": prompt_file, "status": "error", "error": error})
+                continue
+            await queue.put((request_id, prompt, prompt_file))
+        for _ in range(parallelism):
+            await queue.put(None)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            request_id, prompt, prompt_file = item
+            system_prompt_path = Path.cwd() / prompt_file if prompt_file else None
+            await limiter.acquire()
+            started = time.monotonic()
+            record = {"id": request_id, "prompt": prompt, "prompt_file": prompt_file}
+            try:
+                record["script"] = await generator.generate_json_script_async(prompt, system_prompt_path)
+                record["status"] = "ok"
+                console.print(f"[green]✓[/green] {request_id}")
             except Exception as e:
-                self.console.print(f"[bold red]Error saving file: {e}[/bold red]")
+                record["status"] = "error"
+                record["error"] = str(e)
+                console.print(f"[red]✗[/red] {request_id}: {e}")
+            record["elapsed"] = round(time.monotonic() - started, 2)
+            stats[record["status"]] += 1
+            write_result(record)
 
-        except Exception as e:
-            self.console.print(f"[bold red]API Request failed: {e}[/bold red]")
+    try:
+        await asyncio.gather(producer(), *(worker() for _ in range(parallelism)))
+    finally:
+        results_file.close()
+    return stats
 
-    def generate_text_script(self, user_prompt: str):
-        self.console.print(f"\n[bold yellow]Generating text script for:[/bold yellow] {user_prompt}")
-        try:
-            with self.console.status("[bold green]Thinking...[/bold green]", spinner="dots"):
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": self.system_prompt},
-                        {"role": "user", "content": f"""You are an elite Chef 
-                            and AI trainer helping to create social media content,
-                            practical chef food videos for a YouTube channel called PixelPlates.
-                            Generate a detailed script based on {user_prompt}. 
-                            The script will later be used to produce an AI-generated
-                            YouTube Short video using Veo 3.1."""}
-                    ],
-                    temperature=1.5,
-                    response_format={'type': 'text'}
-                )
-                
-                content = response.choices[0].message.content
-            
-            self.console.print(Panel(content, title="Generated Script", border_style="blue"))
-            
-        except Exception as e:
-            self.console.print(f"[bold red]API Request failed: {e}[/bold red]")
+def parse_args():
+    parser = argparse.ArgumentParser(description="PixelPlates script generator")
+    parser.add_argument("--batch", type=Path, help="JSONL file of requests to generate non-interactively")
+    parser.add_argument("--style", default="prompt.txt", help="Prompt file used in batch mode (default: prompt.txt)")
+    parser.add_argument("--results", type=Path, help="Results JSONL (default: scripts/<batch name>.results.jsonl)")
+    parser.add_argument("--parallel", type=int, default=4, help="Concurrent generations in batch mode")
+    parser.add_argument("--rate", type=float, default=0.0, help="Max requests started per second (0 = unlimited)")
+    return parser.parse_args()
+
+def batch_main(args):
+    console = Console()
+    prompt_location = Path.cwd() / args.style
+    try:
+        generator = ScriptGenerator(
+            base_url="https://api.deepseek.com",
+            model="deepseek-chat",
+            system_prompt_path=prompt_location,
+            max_concurrency=args.parallel
+        )
+    except Exception as e:
+        console.print(f"[bold red]Initialization failed: {e}[/bold red]")
+        return
+
+    results_path = args.results or generator.script_dir / f"{args.batch.stem}.results.jsonl"
+    console.print(f"[bold cyan]Batch:[/bold cyan] {args.batch} -> {results_path} (parallel={args.parallel}, rate={args.rate or 'unlimited'}/s)")
+    started = time.monotonic()
+    stats = asyncio.run(run_batch(generator, args.batch, results_path, args.parallel, args.rate, console))
+    console.print(
+        f"[bold]Done in {time.monotonic() - started:.1f}s:[/bold] "
+        f"{stats['ok']} ok, {stats['error']} failed, {stats['skipped']} skipped"
+    )
 
 def main():
+    args = parse_args()
+    if args.batch:
+        batch_main(args)
+        return
+
     console = Console()
     # Get available prompts
     prompts = ScriptGenerator.get_available_prompts()
@@ -170,7 +212,11 @@ def main():
         if not user_input:
             continue
 
-        generator.generate_json_script(user_input)
+        try:
+            generator.generate_json_script(user_input)
+        except Exception:
+            # The generator already reported the failure; keep the session alive
+            continue
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,71 @@
+"""Baseline schema as created by Base.metadata.create_all before migrations existed
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Existing deployments already have these tables; only create what is missing
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("username", sa.String(), nullable=True),
+            sa.Column("hashed_password", sa.String(), nullable=True),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "scripts" not in existing:
+        op.create_table(
+            "scripts",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(), nullable=True),
+            sa.Column("prompt", sa.Text(), nullable=True),
+            sa.Column("prompt_file", sa.String(), nullable=True),
+            sa.Column("input_filename", sa.String(), nullable=True),
+            sa.Column("content", sa.JSON(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("generation_type", sa.String(), nullable=True),
+            sa.Column("user_id", sa.String(), nullable=True),
+        )
+        op.create_index("ix_scripts_id", "scripts", ["id"])
+        op.create_index("ix_scripts_title", "scripts", ["title"])
+        op.create_index("ix_scripts_user_id", "scripts", ["user_id"])
+
+    if "jobs" not in existing:
+        op.create_table(
+            "jobs",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("prompt", sa.Text(), nullable=True),
+            sa.Column("prompt_file", sa.String(), nullable=True),
+            sa.Column("reference_content", sa.Text(), nullable=True),
+            sa.Column("input_filename", sa.String(), nullable=True),
+            sa.Column("generation_type", sa.String(), nullable=True),
+            sa.Column("user_id", sa.String(), nullable=True),
+            sa.Column("script_id", sa.Integer(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("attempts", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_jobs_status", "jobs", ["status"])
+        op.create_index("ix_jobs_user_id", "jobs", ["user_id"])
+        op.create_index("ix_jobs_created_at", "jobs", ["created_at"])
+
+def downgrade():
+    op.drop_table("jobs")
+    op.drop_table("scripts")
+    op.drop_table("users")
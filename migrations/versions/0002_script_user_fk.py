@@ -0,0 +1,106 @@
+"""Typed scripts.user_id foreign key and composite history index
+
+Converts scripts.user_id (and jobs.user_id) from a string to an integer
+foreign key to users.id, backfilling in id-range batches so large tables
+are never locked by one giant UPDATE, and adds the
+(user_id, created_at DESC, id DESC) index the history query scans.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+import os
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "5000"))
+HISTORY_INDEX = "ix_scripts_user_id_created_at"
+
+def _columns(table: str) -> dict:
+    return {c["name"]: c for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+def _indexes(table: str) -> set:
+    return {i["name"] for i in sa.inspect(op.get_bind()).get_indexes(table)}
+
+def _backfill_user_ref(bind):
+    """Copy string user ids into user_ref one id range at a time, each range in its own transaction."""
+    max_id = bind.execute(sa.text("SELECT MAX(id) FROM scripts")).scalar() or 0
+    if bind.dialect.name == "postgresql":
+        statement = sa.text(
+            "UPDATE scripts AS s SET user_ref = u.id FROM users AS u "
+            "WHERE s.id > :lo AND s.id <= :hi AND s.user_id = CAST(u.id AS VARCHAR)"
+        )
+    else:
+        statement = sa.text(
+            "UPDATE scripts SET user_ref = (SELECT u.id FROM users AS u WHERE CAST(u.id AS VARCHAR) = scripts.user_id) "
+            "WHERE id > :lo AND id <= :hi AND user_id IS NOT NULL"
+        )
+    for lo in range(0, max_id, BATCH_SIZE):
+        bind.execute(statement, {"lo": lo, "hi": lo + BATCH_SIZE})
+        print(f"Backfilled scripts.user_id up to id {min(lo + BATCH_SIZE, max_id)} of {max_id}")
+
+def upgrade():
+    bind = op.get_bind()
+
+    # Databases created by create_all with the current models are already typed
+    if not isinstance(_columns("scripts")["user_id"]["type"], sa.Integer):
+        op.add_column("scripts", sa.Column("user_ref", sa.Integer(), nullable=True))
+        with op.get_context().autocommit_block():
+            _backfill_user_ref(bind)
+
+        # Rows whose user no longer exists end up NULL, as the old code never enforced the link
+        with op.batch_alter_table("scripts") as batch:
+            if "ix_scripts_user_id" in _indexes("scripts"):
+                batch.drop_index("ix_scripts_user_id")
+            batch.drop_column("user_id")
+            batch.alter_column("user_ref", new_column_name="user_id")
+        with op.batch_alter_table("scripts") as batch:
+            batch.create_foreign_key("fk_scripts_user_id_users", "users", ["user_id"], ["id"], ondelete="SET NULL")
+
+    if not isinstance(_columns("jobs")["user_id"]["type"], sa.Integer):
+        with op.batch_alter_table("jobs") as batch:
+            batch.alter_column(
+                "user_id",
+                type_=sa.Integer(),
+                existing_type=sa.String(),
+                postgresql_using="NULLIF(user_id, '')::integer",
+            )
+            batch.create_foreign_key("fk_jobs_user_id_users", "users", ["user_id"], ["id"], ondelete="CASCADE")
+
+    if HISTORY_INDEX not in _indexes("scripts"):
+        if bind.dialect.name == "postgresql":
+            # Built without blocking writes; INCLUDE lets history pages be answered from the index alone
+            with op.get_context().autocommit_block():
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {HISTORY_INDEX} "
+                    "ON scripts (user_id, created_at DESC, id DESC) INCLUDE (title, generation_type)"
+                )
+        else:
+            op.create_index(HISTORY_INDEX, "scripts", ["user_id", sa.text("created_at DESC"), sa.text("id DESC")])
+
+def downgrade():
+    op.drop_index(HISTORY_INDEX, table_name="scripts")
+
+    with op.batch_alter_table("jobs") as batch:
+        batch.drop_constraint("fk_jobs_user_id_users", type_="foreignkey")
+        batch.alter_column(
+            "user_id",
+            type_=sa.String(),
+            existing_type=sa.Integer(),
+            postgresql_using="user_id::varchar",
+        )
+
+    with op.batch_alter_table("scripts") as batch:
+        batch.drop_constraint("fk_scripts_user_id_users", type_="foreignkey")
+        batch.alter_column(
+            "user_id",
+            type_=sa.String(),
+            existing_type=sa.Integer(),
+            postgresql_using="user_id::varchar",
+        )
+        batch.create_index("ix_scripts_user_id", ["user_id"])
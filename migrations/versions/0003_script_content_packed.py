@@ -0,0 +1,72 @@
+"""Compressed script bodies
+
+Adds scripts.content_packed (zlib with the script_codec preset dictionary)
+and recompresses existing rows in id-range batches, clearing the JSON
+column as each row is packed. Rows are only recompressed when
+SCRIPT_CONTENT_COMPRESSION is enabled; either format stays readable.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+import json
+import os
+from alembic import op
+import sqlalchemy as sa
+from script_codec import SCRIPT_CONTENT_COMPRESSION, pack_content, unpack_content
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "5000"))
+
+def _columns(table: str) -> dict:
+    return {c["name"]: c for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+def _load(value):
+    # Drivers hand JSON back as text or already decoded depending on the column type
+    return json.loads(value) if isinstance(value, (str, bytes)) else value
+
+def _recompress(bind):
+    """Pack JSON bodies one id range at a time, each range in its own transaction."""
+    max_id = bind.execute(sa.text("SELECT MAX(id) FROM scripts")).scalar() or 0
+    select = sa.text(
+        "SELECT id, content FROM scripts "
+        "WHERE id > :lo AND id <= :hi AND content_packed IS NULL AND content IS NOT NULL"
+    )
+    update = sa.text("UPDATE scripts SET content_packed = :packed, content = NULL WHERE id = :id")
+    for lo in range(0, max_id, BATCH_SIZE):
+        rows = bind.execute(select, {"lo": lo, "hi": lo + BATCH_SIZE}).fetchall()
+        if rows:
+            bind.execute(update, [{"id": row[0], "packed": pack_content(_load(row[1]))} for row in rows])
+        print(f"Recompressed scripts up to id {min(lo + BATCH_SIZE, max_id)} of {max_id}")
+
+def upgrade():
+    bind = op.get_bind()
+
+    if "content_packed" not in _columns("scripts"):
+        op.add_column("scripts", sa.Column("content_packed", sa.LargeBinary(), nullable=True))
+
+    if SCRIPT_CONTENT_COMPRESSION:
+        with op.get_context().autocommit_block():
+            _recompress(bind)
+
+def downgrade():
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text("SELECT MAX(id) FROM scripts")).scalar() or 0
+    select = sa.text(
+        "SELECT id, content_packed FROM scripts WHERE id > :lo AND id <= :hi AND content_packed IS NOT NULL"
+    )
+    update = sa.text("UPDATE scripts SET content = :content WHERE id = :id")
+    for lo in range(0, max_id, BATCH_SIZE):
+        rows = bind.execute(select, {"lo": lo, "hi": lo + BATCH_SIZE}).fetchall()
+        if rows:
+            bind.execute(update, [
+                {"id": row[0], "content": json.dumps(unpack_content(bytes(row[1])), ensure_ascii=False)}
+                for row in rows
+            ])
+
+    with op.batch_alter_table("scripts") as batch:
+        batch.drop_column("content_packed")
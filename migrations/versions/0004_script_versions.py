@@ -0,0 +1,38 @@
+"""Script versions
+
+Adds scripts.parent_id and scripts.version so an edited script (e.g. one
+regenerated segment) is saved as a new row pointing at the script it was
+derived from. Existing rows become version 1 with no parent.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def _columns(table: str) -> dict:
+    return {c["name"]: c for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+def upgrade():
+    columns = _columns("scripts")
+    if "version" not in columns:
+        # Constant server default: a metadata-only change on Postgres 11+, no table rewrite
+        op.add_column("scripts", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    if "parent_id" not in columns:
+        op.add_column("scripts", sa.Column("parent_id", sa.Integer(), nullable=True))
+        with op.batch_alter_table("scripts") as batch:
+            batch.create_foreign_key("fk_scripts_parent_id_scripts", "scripts", ["parent_id"], ["id"], ondelete="SET NULL")
+            batch.create_index("ix_scripts_parent_id", ["parent_id"])
+
+def downgrade():
+    with op.batch_alter_table("scripts") as batch:
+        batch.drop_index("ix_scripts_parent_id")
+        batch.drop_constraint("fk_scripts_parent_id_scripts", type_="foreignkey")
+        batch.drop_column("parent_id")
+        batch.drop_column("version")
@@ -0,0 +1,27 @@
+"""Job lease heartbeat
+
+Adds jobs.heartbeat_at, renewed by the worker while a job runs, so the
+lease measures worker silence rather than total run time.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def _columns(table: str) -> dict:
+    return {c["name"]: c for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+def upgrade():
+    if "heartbeat_at" not in _columns("jobs"):
+        op.add_column("jobs", sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("jobs") as batch:
+        batch.drop_column("heartbeat_at")
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, LargeBinary, ForeignKey, Index
 from database import Base
+from script_codec import content_columns, unpack_content
 from datetime import datetime
 
 class Script(Base):
@@ -13,8 +14,10 @@ class Script(Base):
     # Store the input file name if used
     input_filename = Column(String, nullable=True)
     
-    # The actual generated script
-    content = Column(JSON)
+    # The actual generated script, either zlib-packed or (legacy rows) plain JSON.
+    # Read and write it through `content`.
+    content_json = Column("content", JSON(none_as_null=True), nullable=True)
+    content_packed = Column(LargeBinary, nullable=True)
     
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -23,7 +26,31 @@ class Script(Base):
     generation_type = Column(String, default="standard") # standard, rag
 
     # User Identification
-    user_id = Column(String, index=True, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
+    # Edits are saved as new rows; parent_id points at the script they were derived from
+    parent_id = Column(Integer, ForeignKey("scripts.id", ondelete="SET NULL"), nullable=True, index=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __table_args__ = (
+        # Serves the history query (filter by user, newest first) as an index range scan
+        Index(
+            "ix_scripts_user_id_created_at",
+            user_id, created_at.desc(), id.desc(),
+            postgresql_include=["title", "generation_type"]
+        ),
+    )
+
+    @property
+    def content(self):
+        if self.content_packed is not None:
+            return unpack_content(self.content_packed)
+        return self.content_json
+
+    @content.setter
+    def content(self, value):
+        for name, column_value in content_columns(value).items():
+            setattr(self, name, column_value)
 
 class User(Base):
     __tablename__ = "users"
@@ -32,3 +59,32 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String)
 
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    # Opaque job id handed back to the client
+    id = Column(String, primary_key=True)
+    # queued, running, succeeded, failed
+    status = Column(String, index=True, default="queued")
+
+    # Generation inputs
+    prompt = Column(Text)
+    prompt_file = Column(String, nullable=True)
+    reference_content = Column(Text, nullable=True)
+    input_filename = Column(String, nullable=True)
+    generation_type = Column(String, default="text")
+
+    # User Identification
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=True)
+
+    # Outcome
+    script_id = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    # Renewed by the worker while the job runs; the lease expires when it goes stale
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
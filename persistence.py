@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from sqlalchemy import insert
+from database import AsyncSessionLocal
+from models import Script
+from script_codec import content_columns
+
+SCRIPT_WRITE_QUEUE_SIZE = int(os.getenv("SCRIPT_WRITE_QUEUE_SIZE", "1000"))
+SCRIPT_WRITE_BATCH_SIZE = int(os.getenv("SCRIPT_WRITE_BATCH_SIZE", "50"))
+SCRIPT_WRITE_FLUSH_INTERVAL = float(os.getenv("SCRIPT_WRITE_FLUSH_INTERVAL", "0.5"))
+SCRIPT_WRITE_MAX_RETRIES = int(os.getenv("SCRIPT_WRITE_MAX_RETRIES", "3"))
+# How often spooled records are retried while the database is recovering
+SCRIPT_SPOOL_REPLAY_INTERVAL = float(os.getenv("SCRIPT_SPOOL_REPLAY_INTERVAL", "30"))
+SCRIPT_SPOOL_DIR = Path(os.getenv("SCRIPT_SPOOL_DIR", Path.cwd() / ".cache" / "spool"))
+# How long shutdown waits for the writer to drain before spooling what is left
+SCRIPT_WRITE_STOP_TIMEOUT = float(os.getenv("SCRIPT_WRITE_STOP_TIMEOUT", "10"))
+
+# Queued by stop(): the writer flushes what it holds and exits
+_STOP = object()
+
+def _to_json(record: dict) -> str:
+    data = dict(record)
+    data["created_at"] = data["created_at"].isoformat()
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+def _from_json(line: str) -> dict:
+    data = json.loads(line)
+    data["created_at"] = datetime.fromisoformat(data["created_at"])
+    return data
+
+class ScriptWriter:
+    """Write-behind persistence for generated scripts.
+
+    Requests hand records to submit() and return immediately. A background
+    task drains the bounded queue in batches, writes each script to disk via
+    `file_sink`, and inserts the batch with one multi-row INSERT, retrying
+    with backoff. Batches that still fail (or records that arrive while the
+    queue is full) are appended to a local JSONL spool and replayed later,
+    so nothing is lost while the database is down.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, file_sink=None,
+                 queue_size: int = SCRIPT_WRITE_QUEUE_SIZE, batch_size: int = SCRIPT_WRITE_BATCH_SIZE,
+                 flush_interval: float = SCRIPT_WRITE_FLUSH_INTERVAL, max_retries: int = SCRIPT_WRITE_MAX_RETRIES,
+                 spool_dir: Path = SCRIPT_SPOOL_DIR, replay_interval: float = SCRIPT_SPOOL_REPLAY_INTERVAL):
+        self.session_factory = session_factory
+        self.file_sink = file_sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.replay_interval = replay_interval
+        self.spool_path = Path(spool_dir) / "scripts.jsonl"
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._spool_lock = threading.Lock()
+        self._task = None
+        # Records taken off the queue (or the spool) that are not yet durable
+        self._inflight = []
+
+    def submit(self, title: str, prompt: str, content: dict, generation_type: str, user_id,
+               input_filename: str = None, prompt_file: str = None):
+        """Queue a script for persistence without waiting for the database or disk."""
+        record = {
+            "title": title,
+            "prompt": prompt,
+            "prompt_file": prompt_file,
+            "content": content,
+            "generation_type": generation_type,
+            "input_filename": input_filename,
+            "user_id": user_id,
+            "created_at": datetime.utcnow(),
+        }
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            # Never block a request on persistence; the spool catches the overflow
+            print("Warning: script write queue full, spooling to disk")
+            self._spool([record])
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = SCRIPT_WRITE_STOP_TIMEOUT):
+        """Flush everything queued or in flight, spooling whatever the database won't take.
+
+        The writer drains on its own for up to `timeout` seconds; after that it is
+        cancelled and the records it still holds go to the spool.
+        """
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._drain(), timeout)
+            except asyncio.TimeoutError:
+                print("Warning: script writer did not drain in time, spooling the rest")
+                self._task.cancel()
+                await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        remaining = self._take_queued()
+        for i in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[i:i + self.batch_size])
+
+    async def _drain(self):
+        await self._queue.put(_STOP)
+        await asyncio.shield(self._task)
+
+    def _take_queued(self) -> list[dict]:
+        records = []
+        while not self._queue.empty():
+            record = self._queue.get_nowait()
+            if record is not _STOP:
+                records.append(record)
+        return records
+
+    async def _run(self):
+        try:
+            await self._replay_spool()
+            last_replay = time.monotonic()
+            while True:
+                try:
+                    first = await asyncio.wait_for(self._queue.get(), self.replay_interval)
+                except asyncio.TimeoutError:
+                    first = None
+                if first is _STOP:
+                    return
+
+                stopping = False
+                if first is not None:
+                    batch = self._inflight = [first]
+                    deadline = time.monotonic() + self.flush_interval
+                    while len(batch) < self.batch_size:
+                        timeout = deadline - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        try:
+                            record = await asyncio.wait_for(self._queue.get(), timeout)
+                        except asyncio.TimeoutError:
+                            break
+                        if record is _STOP:
+                            stopping = True
+                            break
+                        batch.append(record)
+                    await self._flush(batch)
+                    self._inflight = []
+                if stopping:
+                    return
+
+                if time.monotonic() - last_replay >= self.replay_interval:
+                    await self._replay_spool()
+                    last_replay = time.monotonic()
+        except asyncio.CancelledError:
+            # Cancelled mid-batch (accumulating, inserting or backing off): keep those records
+            unsaved = self._inflight + self._take_queued()
+            self._inflight = []
+            if unsaved:
+                self._spool(unsaved)
+            raise
+
+    async def _flush(self, batch: list[dict]):
+        if self.file_sink is not None:
+            await asyncio.to_thread(self._write_files, batch)
+        if not await self._insert(batch):
+            await asyncio.to_thread(self._spool, batch)
+
+    def _write_files(self, batch: list[dict]):
+        for record in batch:
+            try:
+                self.file_sink(record)
+            except Exception as e:
+                # The database row is the record of truth; a missing file is only logged
+                print(f"Warning: failed to write script file for '{record['title']}': {e}")
+
+    async def _insert(self, batch: list[dict]) -> bool:
+        """Insert a batch with retries. Returns False if every attempt failed."""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with self.session_factory() as db:
+                    await db.execute(insert(Script), [self._row(record) for record in batch])
+                    await db.commit()
+                print(f"Saved {len(batch)} script(s) to DB")
+                return True
+            except Exception as e:
+                print(f"DB write failed (attempt {attempt}/{self.max_retries}) for {len(batch)} script(s): {e}")
+                if attempt < self.max_retries:
+                    # Exponential backoff with jitter so workers don't retry in lockstep
+                    await asyncio.sleep(min(10.0, 0.5 * 2 ** (attempt - 1)) * (0.5 + random.random()))
+        return False
+
+    @staticmethod
+    def _row(record: dict) -> dict:
+        row = {k: v for k, v in record.items() if k != "content"}
+        row.update(content_columns(record["content"]))
+        return row
+
+    def _spool(self, batch: list[dict]):
+        with self._spool_lock:
+            self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spool_path, 'a', encoding='utf-8') as f:
+                for record in batch:
+                    f.write(_to_json(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        print(f"Spooled {len(batch)} script(s) to {self.spool_path}")
+
+    def _take_spool(self) -> list[dict]:
+        """Atomically claim the current spool file and return its records."""
+        with self._spool_lock:
+            if not self.spool_path.exists():
+                return []
+            claimed = self.spool_path.with_suffix(f".{os.getpid()}.replay")
+            os.replace(self.spool_path, claimed)
+        records = []
+        with open(claimed, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        records.append(_from_json(line))
+                    except (ValueError, KeyError):
+                        print(f"Warning: dropping unreadable spool line: {line[:80]}")
+        os.remove(claimed)
+        return records
+
+    async def _replay_spool(self):
+        records = await asyncio.to_thread(self._take_spool)
+        if not records:
+            return
+        print(f"Replaying {len(records)} spooled script(s)")
+        for i in range(0, len(records), self.batch_size):
+            # Everything not yet replayed is off disk until it is inserted or spooled again
+            self._inflight = records[i:]
+            batch = records[i:i + self.batch_size]
+            # Failed batches go straight back to the spool for the next replay
+            if not await self._insert(batch):
+                await asyncio.to_thread(self._spool, batch)
+        self._inflight = []
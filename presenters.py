@@ -0,0 +1,101 @@
+import json
+from contextlib import nullcontext
+from rich.console import Console
+from rich.panel import Panel
+from rich.syntax import Syntax
+
+class Presenter:
+    """Receives progress and results from ScriptGenerator. The base class shows nothing."""
+
+    def info(self, message: str):
+        pass
+
+    def warning(self, message: str):
+        pass
+
+    def error(self, message: str, raw: str = None):
+        pass
+
+    def generation_started(self, kind: str, user_prompt: str, reference_chars: int = None, prompt_name: str = None):
+        pass
+
+    def thinking(self):
+        """Context manager wrapped around the provider call."""
+        return nullcontext()
+
+    def cache_hit(self, kind: str = "hit", similarity: float = None):
+        pass
+
+    def response_received(self):
+        pass
+
+    def script_saved(self, path):
+        pass
+
+    def script_ready(self, script: dict):
+        pass
+
+    def text_ready(self, text: str):
+        pass
+
+class SilentPresenter(Presenter):
+    """No output at all."""
+
+class LogPresenter(Presenter):
+    """Plain one-line log messages for servers; never renders or re-serializes scripts."""
+
+    def info(self, message: str):
+        print(message)
+
+    def warning(self, message: str):
+        print(f"Warning: {message}")
+
+    def error(self, message: str, raw: str = None):
+        print(f"Error: {message}" + (f" Raw response: {raw}" if raw is not None else ""))
+
+    def script_saved(self, path):
+        print(f"Script saved to: {path}")
+
+class RichPresenter(Presenter):
+    """Interactive terminal output for the CLI: spinner, status lines and a highlighted script panel."""
+
+    def __init__(self, console: Console = None):
+        self.console = console or Console()
+
+    def info(self, message: str):
+        self.console.print(f"[blue]{message}[/blue]")
+
+    def warning(self, message: str):
+        self.console.print(f"[yellow]Warning: {message}[/yellow]")
+
+    def error(self, message: str, raw: str = None):
+        self.console.print(f"[bold red]Error: {message}[/bold red]")
+        if raw is not None:
+            self.console.print(f"Raw response: {raw}")
+
+    def generation_started(self, kind: str, user_prompt: str, reference_chars: int = None, prompt_name: str = None):
+        self.console.print(f"\n[bold yellow]Generating {kind} script for:[/bold yellow] {user_prompt}")
+        if reference_chars:
+            self.console.print(f"[dim]With reference content ({reference_chars} chars)[/dim]")
+        if prompt_name:
+            self.console.print(f"[dim]Using custom prompt: {prompt_name}[/dim]")
+
+    def thinking(self):
+        return self.console.status("[bold green]Thinking...[/bold green]", spinner="dots")
+
+    def cache_hit(self, kind: str = "hit", similarity: float = None):
+        label = "Cache hit!" if kind == "hit" else f"Similar prompt cached (similarity {similarity:.2f})"
+        self.console.print(f"[bold green]{label}[/bold green]")
+
+    def response_received(self):
+        self.console.print("[bold green]Response received![/bold green]")
+
+    def script_saved(self, path):
+        self.console.print(f"[bold green]Script saved to:[/bold green] {path}")
+
+    def script_ready(self, script: dict):
+        syntax = Syntax(json.dumps(script, indent=4, ensure_ascii=False), "json", theme="monokai", line_numbers=True)
+        self.console.print(Panel(syntax, title="Generated Script", border_style="green"))
+
+    def text_ready(self, text: str):
+        self.console.print(Panel(text, title="Generated Script", border_style="blue"))
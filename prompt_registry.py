@@ -0,0 +1,121 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+PROMPT_WATCH_INTERVAL = float(os.getenv("PROMPT_WATCH_INTERVAL", "2.0"))
+
+class PromptTemplate:
+    """A loaded system prompt file and the content hash downstream caches key on."""
+
+    __slots__ = ("name", "path", "content", "sha256", "mtime_ns", "size")
+
+    def __init__(self, path: Path, content: str, mtime_ns: int, size: int):
+        self.name = path.name
+        self.path = path
+        self.content = content
+        self.sha256 = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        self.mtime_ns = mtime_ns
+        self.size = size
+
+def _read_template(path: Path) -> PromptTemplate:
+    stat = path.stat()
+    with open(path, mode='r', encoding='utf-8') as f:
+        content = f.read()
+    return PromptTemplate(path, content, stat.st_mtime_ns, stat.st_size)
+
+def _is_prompt_file(path: Path) -> bool:
+    return path.suffix == ".txt" and "prompt" in path.name
+
+class PromptRegistry:
+    """Loads prompt*.txt files once and hot-reloads them when they change on disk.
+
+    Lookups are in-memory; a daemon thread polls file stats every
+    `watch_interval` seconds so edits are picked up without a restart.
+    """
+
+    def __init__(self, directory: Path = None, watch_interval: float = PROMPT_WATCH_INTERVAL):
+        self.directory = (directory or Path.cwd()).resolve()
+        self.watch_interval = watch_interval
+        # Resolved path -> PromptTemplate; replaced wholesale so readers never need a lock
+        self._templates = {}
+        self._extra_paths = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self.refresh()
+
+    def names(self) -> list[str]:
+        return sorted(t.name for path, t in self._templates.items() if path.parent == self.directory)
+
+    def get(self, name: str) -> PromptTemplate:
+        """Look up a prompt in the registry directory by filename."""
+        template = self._templates.get(self.directory / name)
+        if template is None:
+            raise FileNotFoundError(f"System prompt file not found: {name}")
+        return template
+
+    def get_path(self, path: Path) -> PromptTemplate:
+        """Look up a prompt by path, tracking files outside the directory on first use."""
+        resolved = Path(path).resolve()
+        template = self._templates.get(resolved)
+        if template is not None:
+            return template
+        if not resolved.exists():
+            raise FileNotFoundError(f"System prompt file not found: {path}")
+        template = _read_template(resolved)
+        with self._lock:
+            self._extra_paths.add(resolved)
+            templates = dict(self._templates)
+            templates[resolved] = template
+            self._templates = templates
+        return template
+
+    def hashes(self) -> dict[str, str]:
+        return {t.name: t.sha256 for path, t in self._templates.items() if path.parent == self.directory}
+
+    def refresh(self) -> list[str]:
+        """Rescan the directory, reloading only files whose size or mtime changed. Returns changed names."""
+        with self._lock:
+            current = self._templates
+            paths = {p.resolve() for p in self.directory.glob("*.txt") if _is_prompt_file(p)}
+            paths |= {p for p in self._extra_paths if p.exists()}
+
+            templates = {}
+            changed = []
+            for path in paths:
+                try:
+                    stat = path.stat()
+                    existing = current.get(path)
+                    if existing and existing.mtime_ns == stat.st_mtime_ns and existing.size == stat.st_size:
+                        templates[path] = existing
+                        continue
+                    templates[path] = _read_template(path)
+                    changed.append(path.name)
+                except OSError as e:
+                    print(f"Warning: could not load prompt {path}: {e}")
+            changed.extend(p.name for p in current if p not in templates)
+            self._templates = templates
+        return changed
+
+    def start_watching(self):
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="prompt-registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.watch_interval + 1)
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval):
+            try:
+                changed = self.refresh()
+                if changed:
+                    print(f"Reloaded prompts: {', '.join(sorted(changed))}")
+            except Exception as e:
+                print(f"Warning: prompt reload failed: {e}")
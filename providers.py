@@ -0,0 +1,330 @@
+import asyncio
+import bisect
+import json
+import os
+import random
+import time
+import openai
+from openai import AsyncOpenAI
+
+# Overall time budget for one generation, across retries and hedges
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# Fire a backup request once the primary runs past its endpoint's p95 latency
+LLM_HEDGE = os.getenv("LLM_HEDGE", "true").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2.0"))
+# Latency samples an endpoint needs before its p95 is trusted to trigger hedges
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Hedge to the same endpoint when it is the only one (doubles its load for little gain)
+LLM_HEDGE_SAME_ENDPOINT = os.getenv("LLM_HEDGE_SAME_ENDPOINT", "false").lower() in ("1", "true", "yes")
+# Hedges allowed in flight at once; the provider sees up to SCHEDULER_MAX_CONCURRENT plus this many calls
+LLM_HEDGE_MAX_INFLIGHT = int(os.getenv("LLM_HEDGE_MAX_INFLIGHT", "4"))
+# Extra endpoints as JSON: [{"name": ..., "base_url": ..., "model": ..., "api_key_env": ...}, ...]
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS")
+
+# Errors worth another attempt (possibly on another endpoint); anything else is the caller's fault
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram that halves its counts periodically so it tracks recent behaviour."""
+
+    # 10ms .. ~10min in 25% steps
+    BOUNDS = [0.01 * 1.25 ** i for i in range(50)]
+
+    def __init__(self, decay_every: int = 1000):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.total = 0
+        self.decay_every = decay_every
+        self._since_decay = 0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.total += 1
+        self._since_decay += 1
+        if self._since_decay >= self.decay_every:
+            self.counts = [c // 2 for c in self.counts]
+            self.total = sum(self.counts)
+            self._since_decay = 0
+
+    def quantile(self, q: float):
+        """Upper bound of the bucket holding the q-th quantile, or None without data."""
+        if not self.total:
+            return None
+        target = q * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return self.BOUNDS[i] if i < len(self.BOUNDS) else self.BOUNDS[-1]
+        return self.BOUNDS[-1]
+
+class Provider:
+    """One OpenAI-compatible endpoint/model pair and its observed latency."""
+
+    def __init__(self, name: str, base_url: str, model: str, api_key: str, client=None):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.client = client if client is not None else AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.latency = LatencyHistogram()
+        self.first_token = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        # Recent failure rate, used to steer traffic away from a struggling endpoint
+        self.error_rate = 0.0
+
+    def record_success(self):
+        self.requests += 1
+        self.error_rate *= 0.9
+
+    def record_error(self):
+        self.requests += 1
+        self.errors += 1
+        self.error_rate = 0.9 * self.error_rate + 0.1
+
+    def score(self, streaming: bool = False) -> float:
+        """Lower is better: typical latency inflated by recent errors."""
+        histogram = self.first_token if streaming else self.latency
+        p50 = histogram.quantile(0.5)
+        return (p50 if p50 is not None else 1.0) * (1 + 10 * self.error_rate)
+
+    def stats(self) -> dict:
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "name": self.name,
+            "model": self.model,
+            "requests": self.requests,
+            "errors": self.errors,
+            "p50_ms": ms(self.latency.quantile(0.5)),
+            "p95_ms": ms(self.latency.quantile(0.95)),
+            "p99_ms": ms(self.latency.quantile(0.99)),
+            "first_token_p95_ms": ms(self.first_token.quantile(0.95)),
+        }
+
+async def _close_stream(stream):
+    close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+    if close is not None:
+        await close()
+
+def _delta_text(chunk) -> str:
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
+
+class ProviderPool:
+    """Routes chat completions across OpenAI-compatible endpoints.
+
+    Each call gets an overall deadline. Retryable failures are retried with
+    full-jitter backoff, preferring endpoints that haven't failed yet.
+    Endpoints are ranked by their latency histograms and recent error rate. With hedging on, a
+    backup request goes to the next-ranked endpoint once the primary exceeds
+    that endpoint's p95, and whichever answers first wins. There is no hedge
+    until the primary has `hedge_min_samples` latencies recorded, none to the
+    same endpoint unless `hedge_same_endpoint` is set, and at most
+    `hedge_max_inflight` at a time. Streams are hedged and retried only until
+    the first token arrives.
+    """
+
+    def __init__(self, providers: list[Provider], deadline: float = LLM_DEADLINE_SECONDS,
+                 max_retries: int = LLM_MAX_RETRIES, hedge: bool = LLM_HEDGE, hedge_min_delay: float = LLM_HEDGE_MIN_DELAY,
+                 hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES, hedge_same_endpoint: bool = LLM_HEDGE_SAME_ENDPOINT,
+                 hedge_max_inflight: int = LLM_HEDGE_MAX_INFLIGHT):
+        if not providers:
+            raise ValueError("ProviderPool needs at least one provider")
+        self.providers = providers
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_same_endpoint = hedge_same_endpoint
+        self.hedge_max_inflight = hedge_max_inflight
+        self.hedges = 0
+        self.hedges_skipped = 0
+        self._hedges_inflight = 0
+        self.hedge_wins = 0
+
+    @classmethod
+    def from_env(cls, base_url: str, model: str, api_key: str, **kwargs):
+        """The given endpoint, or the LLM_PROVIDERS list when that is set."""
+        if not LLM_PROVIDERS:
+            return cls([Provider("default", base_url, model, api_key)], **kwargs)
+        providers = []
+        for i, spec in enumerate(json.loads(LLM_PROVIDERS)):
+            key = os.getenv(spec["api_key_env"]) if spec.get("api_key_env") else api_key
+            providers.append(Provider(spec.get("name", f"provider-{i}"), spec["base_url"], spec["model"], key))
+        return cls(providers, **kwargs)
+
+    def _ranked(self, failed: set, streaming: bool = False) -> list[Provider]:
+        # Endpoints that already failed this call go last, so retries fall back to the others
+        return sorted(self.providers, key=lambda p: (p in failed, p.score(streaming)))
+
+    def _hedge_delay(self, provider: Provider, streaming: bool = False):
+        """Seconds to wait before hedging a call to `provider`, or None to not hedge it."""
+        histogram = provider.first_token if streaming else provider.latency
+        if histogram.total < self.hedge_min_samples:
+            # A cold histogram would hedge every call after the floor delay
+            return None
+        return max(self.hedge_min_delay, histogram.quantile(0.95))
+
+    def _hedge_target(self, ranked: list[Provider]):
+        """The runner-up endpoint, or None when there is nothing else to hedge to."""
+        if len(ranked) > 1:
+            return ranked[1]
+        return ranked[0] if self.hedge_same_endpoint else None
+
+    def _hedge_done(self, _task):
+        self._hedges_inflight -= 1
+
+    async def complete(self, deadline: float = None, **kwargs) -> str:
+        """Run a (non-streaming) chat completion and return the message content.
+
+        `deadline` (seconds) overrides the pool default when the caller has a tighter budget.
+        """
+        deadline = time.monotonic() + (self.deadline if deadline is None else min(deadline, self.deadline))
+        return await self._with_retries(self._hedged_complete, kwargs, streaming=False, deadline=deadline)
+
+    async def stream(self, deadline: float = None, **kwargs):
+        """Yield content deltas of a streaming chat completion."""
+        deadline = time.monotonic() + (self.deadline if deadline is None else min(deadline, self.deadline))
+        stream, iterator, first = await self._with_retries(self._hedged_open, kwargs, streaming=True, deadline=deadline)
+        try:
+            if first:
+                yield first
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError("Generation exceeded its deadline")
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+                text = _delta_text(chunk)
+                if text:
+                    yield text
+        finally:
+            await _close_stream(stream)
+
+    async def _with_retries(self, attempt_fn, kwargs: dict, streaming: bool, deadline: float):
+        last_error = None
+        failed = set()
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                return await asyncio.wait_for(attempt_fn(self._ranked(failed, streaming), kwargs, failed), remaining)
+            except RETRYABLE_ERRORS as e:
+                last_error = e
+                print(f"LLM attempt {attempt + 1}/{self.max_retries + 1} failed: {type(e).__name__}: {e}")
+                if attempt < self.max_retries:
+                    backoff = random.uniform(0, min(8.0, 0.5 * 2 ** attempt))
+                    await asyncio.sleep(min(backoff, max(0.0, deadline - time.monotonic())))
+        if last_error is not None:
+            raise last_error
+        raise asyncio.TimeoutError("Generation exceeded its deadline")
+
+    async def _race(self, ranked: list[Provider], call, streaming: bool):
+        """Run `call(provider)` on the best endpoint, hedging to the runner-up after its p95."""
+        primary = ranked[0]
+        first = asyncio.create_task(call(primary))
+        tasks = {first}
+        try:
+            delay = self._hedge_delay(primary, streaming) if self.hedge else None
+            backup = self._hedge_target(ranked) if delay is not None else None
+            if backup is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    if self._hedges_inflight >= self.hedge_max_inflight:
+                        self.hedges_skipped += 1
+                    else:
+                        self.hedges += 1
+                        self._hedges_inflight += 1
+                        hedge = asyncio.create_task(call(backup))
+                        hedge.add_done_callback(self._hedge_done)
+                        tasks.add(hedge)
+
+            error = None
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+                if streaming:
+                    # A losing stream may have opened just before being cancelled
+                    for result in results:
+                        if isinstance(result, tuple):
+                            await _close_stream(result[0])
+
+    async def _hedged_complete(self, ranked: list[Provider], kwargs: dict, failed: set) -> str:
+        async def call(provider: Provider):
+            started = time.monotonic()
+            try:
+                response = await provider.client.chat.completions.create(model=provider.model, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                provider.record_error()
+                failed.add(provider)
+                raise
+            provider.latency.record(time.monotonic() - started)
+            provider.record_success()
+            return response.choices[0].message.content
+
+        return await self._race(ranked, call, streaming=False)
+
+    async def _hedged_open(self, ranked: list[Provider], kwargs: dict, failed: set):
+        async def call(provider: Provider):
+            started = time.monotonic()
+            stream = None
+            try:
+                stream = await provider.client.chat.completions.create(model=provider.model, stream=True, **kwargs)
+                iterator = stream.__aiter__()
+                # Wait for real content so a stalled stream counts as slow, not as started
+                text = ""
+                while not text:
+                    try:
+                        text = _delta_text(await iterator.__anext__())
+                    except StopAsyncIteration:
+                        break
+            except asyncio.CancelledError:
+                if stream is not None:
+                    await _close_stream(stream)
+                raise
+            except Exception:
+                if stream is not None:
+                    await _close_stream(stream)
+                provider.record_error()
+                failed.add(provider)
+                raise
+            provider.first_token.record(time.monotonic() - started)
+            provider.record_success()
+            return stream, iterator, text
+
+        return await self._race(ranked, call, streaming=True)
+
+    def stats(self) -> dict:
+        return {
+            "providers": [p.stats() for p in self.providers],
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedges_skipped": self.hedges_skipped,
+        }
@@ -0,0 +1,140 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+# Rough token allowance for reference material inside the user message
+REFERENCE_TOKEN_BUDGET = int(os.getenv("REFERENCE_TOKEN_BUDGET", "3000"))
+REFERENCE_CHUNK_WORDS = int(os.getenv("REFERENCE_CHUNK_WORDS", "150"))
+RETRIEVAL_CACHE_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_ENTRIES", "32"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and the with of for in on to is are be it this that as at by or from your you i we "
+    "make how video short script".split()
+)
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English)."""
+    return len(text) // 4 + 1
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+def _split_long_lines(text: str, chunk_words: int):
+    """Yield the non-empty lines of `text`, cutting any longer than `chunk_words` words on word boundaries."""
+    for line in text.splitlines():
+        words = line.split()
+        if len(words) <= chunk_words:
+            if words:
+                yield line.strip()
+            continue
+        for start in range(0, len(words), chunk_words):
+            yield " ".join(words[start:start + chunk_words])
+
+def chunk_text(text: str, chunk_words: int = REFERENCE_CHUNK_WORDS) -> list[str]:
+    """Group whole lines into chunks of roughly `chunk_words` words, keeping recipe lists intact.
+
+    A single line longer than a chunk (e.g. a PDF page extracted without line
+    breaks) is split on word boundaries.
+    """
+    chunks = []
+    current = []
+    current_words = 0
+    for line in _split_long_lines(text, chunk_words):
+        words = len(line.split())
+        if current and current_words + words > chunk_words:
+            chunks.append("\n".join(current))
+            current = []
+            current_words = 0
+        current.append(line)
+        current_words += words
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of chunks."""
+
+    def __init__(self, chunks: list[str], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(chunk)) for chunk in chunks]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        doc_freq = Counter()
+        for tf in self.term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(chunks)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    def scores(self, query: str) -> list[float]:
+        terms = [t for t in set(tokenize(query)) if t in self.idf]
+        results = []
+        for tf, length in zip(self.term_freqs, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            results.append(score)
+        return results
+
+class ReferenceRetriever:
+    """Selects the passages of a reference document most relevant to a request.
+
+    Indexes are cached per upload content hash, so repeated uploads of the
+    same cookbook are chunked and indexed once.
+    """
+
+    def __init__(self, token_budget: int = REFERENCE_TOKEN_BUDGET, cache_entries: int = RETRIEVAL_CACHE_ENTRIES):
+        self.token_budget = token_budget
+        self.cache_entries = cache_entries
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_index(self, digest: str, text: str) -> BM25Index:
+        with self._lock:
+            index = self._indexes.get(digest)
+            if index is not None:
+                self._indexes.move_to_end(digest)
+                return index
+        index = BM25Index(chunk_text(text))
+        with self._lock:
+            self._indexes[digest] = index
+            while len(self._indexes) > self.cache_entries:
+                self._indexes.popitem(last=False)
+        return index
+
+    def select(self, digest: str, text: str, query: str, token_budget: int = None) -> str:
+        """Return the reference text trimmed to the best-matching passages within the token budget."""
+        budget = token_budget or self.token_budget
+        if estimate_tokens(text) <= budget:
+            return text
+
+        index = self._get_index(digest, text)
+        scores = index.scores(query)
+        # Best first; ties (including a query with no known terms) fall back to document order
+        ranked = sorted(range(len(index.chunks)), key=lambda i: (-scores[i], i))
+
+        selected = []
+        used = 0
+        for i in ranked:
+            cost = estimate_tokens(index.chunks[i])
+            if used + cost > budget:
+                continue
+            selected.append(i)
+            used += cost
+            if budget - used < 50:
+                break
+
+        if not selected and ranked:
+            # Every chunk is over budget on its own (e.g. very long words); never drop the reference entirely
+            return index.chunks[ranked[0]][:max(1, budget - 1) * 4]
+
+        # Present passages in their original order so steps read naturally
+        return "\n...\n".join(index.chunks[i] for i in sorted(selected))
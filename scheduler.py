@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+# Generations allowed in flight at once; match the provider's concurrency quota
+SCHEDULER_MAX_CONCURRENT = int(os.getenv("SCHEDULER_MAX_CONCURRENT", os.getenv("MAX_CONCURRENT_GENERATIONS", "32")))
+# Per-user token bucket: sustained requests per minute and burst size
+SCHEDULER_USER_RATE_PER_MINUTE = float(os.getenv("SCHEDULER_USER_RATE_PER_MINUTE", "20"))
+SCHEDULER_USER_BURST = int(os.getenv("SCHEDULER_USER_BURST", "5"))
+# Waiting requests allowed per user and in total before new ones get a 429
+SCHEDULER_MAX_QUEUED_PER_USER = int(os.getenv("SCHEDULER_MAX_QUEUED_PER_USER", "4"))
+SCHEDULER_MAX_QUEUED = int(os.getenv("SCHEDULER_MAX_QUEUED", "256"))
+
+class RateLimited(Exception):
+    """Raised when a request is refused admission; `retry_after` is in seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, count: int = 1) -> float:
+        """Consume `count` tokens. Returns 0 on success, else seconds until enough are available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= count:
+            self.tokens -= count
+            return 0.0
+        return (count - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+class FairScheduler:
+    """Admission control and weighted fair queuing for LLM calls.
+
+    At most `max_concurrent` slots are held at once; a holder may take
+    several (one per provider call it makes). Each user is rate-limited
+    by a token bucket and may have only a few requests waiting. Waiting
+    requests are granted in order of virtual finish time (start tag plus
+    cost / weight), so a user with a deep backlog can't push others back. Everything
+    runs on the event loop; there is no locking.
+    """
+
+    def __init__(self, max_concurrent: int = SCHEDULER_MAX_CONCURRENT,
+                 rate_per_minute: float = SCHEDULER_USER_RATE_PER_MINUTE, burst: int = SCHEDULER_USER_BURST,
+                 max_queued_per_user: int = SCHEDULER_MAX_QUEUED_PER_USER, max_queued: int = SCHEDULER_MAX_QUEUED):
+        self.max_concurrent = max_concurrent
+        self.rate_per_second = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_queued_per_user = max_queued_per_user
+        self.max_queued = max_queued
+
+        self._active = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._queued = 0
+        self._queued_by_user = {}
+        self._buckets = {}
+
+        # Recent queue waits and service times for stats and Retry-After estimates
+        self._waits = deque(maxlen=1000)
+        self._service_ewma = 5.0
+        self.admitted = 0
+        self.rejected = 0
+
+    def admit(self, user_id, cost: int = 1):
+        """Charge `cost` tokens to the user's bucket and check queue room, raising RateLimited if refused."""
+        queued = self._queued_by_user.get(user_id, 0)
+        if queued >= self.max_queued_per_user:
+            self.rejected += 1
+            raise RateLimited("Too many requests in progress", self._estimated_wait(queued))
+        if self._queued >= self.max_queued:
+            self.rejected += 1
+            raise RateLimited("Server is busy", self._estimated_wait(self._queued))
+
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.rate_per_second, self.burst)
+        wait = bucket.take(min(cost, self.burst))
+        if wait > 0:
+            self.rejected += 1
+            raise RateLimited("Rate limit exceeded", wait)
+        self.admitted += 1
+
+    @asynccontextmanager
+    async def slot(self, user_id, weight: float = 1.0, cost: float = 1.0, admit: bool = True, slots: int = 1):
+        """Hold `slots` of the concurrency slots for the duration of the block.
+
+        Pass admit=False when admit() was already called for this request, or
+        for background work that shouldn't be rate-limited. The slots are
+        granted together, and never more than `max_concurrent`.
+        """
+        if admit:
+            self.admit(user_id, round(cost))
+        slots = max(1, min(slots, self.max_concurrent))
+        waited = await self._acquire(user_id, weight, cost, slots)
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self._service_ewma = 0.9 * self._service_ewma + 0.1 * (time.monotonic() - started)
+            self._release(slots)
+
+    async def _acquire(self, user_id, weight: float, cost: float, slots: int = 1) -> float:
+        start = max(self._virtual_time, self._last_finish.get(user_id, 0.0))
+        finish = start + cost / weight
+        self._last_finish[user_id] = finish
+
+        if self._active + slots <= self.max_concurrent and not self._queued:
+            self._active += slots
+            self._virtual_time = start
+            self._waits.append(0.0)
+            return 0.0
+
+        enqueued = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        entry = [finish, next(self._seq), user_id, future, slots]
+        heapq.heappush(self._heap, entry)
+        self._queued += 1
+        self._queued_by_user[user_id] = self._queued_by_user.get(user_id, 0) + 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled; hand the slots on
+                self._release(slots)
+            else:
+                entry[3] = None
+                self._unqueue(user_id)
+                # A cancelled head may have been holding back smaller requests behind it
+                self._grant()
+            raise
+        waited = time.monotonic() - enqueued
+        self._waits.append(waited)
+        return waited
+
+    def _release(self, slots: int = 1):
+        self._active -= slots
+        self._grant()
+
+    def _grant(self):
+        while self._heap:
+            finish, _, user_id, future, wanted = self._heap[0]
+            if future is None:
+                # Cancelled while waiting; already unqueued
+                heapq.heappop(self._heap)
+                continue
+            if self._active + wanted > self.max_concurrent:
+                # The head waits for enough free slots; granting smaller requests past it would starve it
+                break
+            heapq.heappop(self._heap)
+            self._unqueue(user_id)
+            self._virtual_time = finish
+            self._active += wanted
+            future.set_result(None)
+        if not self._queued and self._active == 0:
+            self._heap.clear()
+            # Idle: reset tags so they don't grow without bound
+            self._virtual_time = 0.0
+            self._last_finish.clear()
+
+    def _unqueue(self, user_id):
+        self._queued -= 1
+        remaining = self._queued_by_user[user_id] - 1
+        if remaining:
+            self._queued_by_user[user_id] = remaining
+        else:
+            del self._queued_by_user[user_id]
+
+    def _estimated_wait(self, ahead: int) -> float:
+        return self._service_ewma * (ahead + 1) / self.max_concurrent
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def percentile(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else 0.0
+
+        return {
+            "active": self._active,
+            "max_concurrent": self.max_concurrent,
+            "queued": self._queued,
+            "queued_users": len(self._queued_by_user),
+            "wait_ms_p50": percentile(0.5),
+            "wait_ms_p95": percentile(0.95),
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+            "service_s_avg": round(self._service_ewma, 2),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,143 @@
+import json
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, create_model
+from json_repair import repair_json, normalize_script, normalize_segment_keys
+from scoring import Rubric
+
+class Segment(BaseModel):
+    """One timed segment of a hosted or no-host script (prompt.txt, prompt_no_host.txt)."""
+    model_config = ConfigDict(extra="allow", str_strip_whitespace=True)
+
+    time: str = Field(min_length=1)
+    scene_description: str = Field(min_length=1)
+    voiceover: str = Field(min_length=1)
+    on_screen_text: str = Field(min_length=1)
+
+class AsmrSegment(Segment):
+    """ASMR segments (prompt_asmr.txt) centre on audio_cues; narration is optional."""
+
+    audio_cues: str = Field(min_length=1)
+    voiceover: str = "N/A"
+
+# Segment model per shipped prompt style; other prompts are matched on their content
+STYLE_SEGMENTS = {
+    "prompt.txt": Segment,
+    "prompt_no_host.txt": Segment,
+    "prompt_asmr.txt": AsmrSegment,
+}
+
+# Field spellings models drift into, keyed by their normalized form
+FIELD_ALIASES = {
+    "time": "time", "timing": "time", "timestamp": "time", "time_range": "time", "duration": "time",
+    "scene_description": "scene_description", "scene": "scene_description", "description": "scene_description",
+    "visual": "scene_description", "visuals": "scene_description", "visual_description": "scene_description",
+    "voiceover": "voiceover", "voice_over": "voiceover", "vo": "voiceover", "narration": "voiceover", "voice": "voiceover",
+    "on_screen_text": "on_screen_text", "onscreen_text": "on_screen_text", "on_screen": "on_screen_text",
+    "text_overlay": "on_screen_text", "caption": "on_screen_text", "text": "on_screen_text", "subtitle": "on_screen_text",
+    "audio_cues": "audio_cues", "audio_cue": "audio_cues", "audio": "audio_cues", "sound": "audio_cues",
+    "sounds": "audio_cues", "sfx": "audio_cues",
+}
+
+class ScriptValidationError(ValueError):
+    """Model output that local repair could not turn into a valid script.
+
+    `partial` is the best-effort script (None if nothing parsed) and `missing`
+    lists the segment keys still absent or invalid, for a targeted follow-up.
+    """
+
+    def __init__(self, message: str, partial: dict = None, missing: list = None):
+        super().__init__(message)
+        self.partial = partial
+        self.missing = missing or []
+
+def segment_model(template_name: str, prompt_text: str) -> type[Segment]:
+    model = STYLE_SEGMENTS.get(template_name)
+    if model is None:
+        model = AsmrSegment if '"audio_cues"' in prompt_text or "audio_cues —" in prompt_text else Segment
+    return model
+
+@lru_cache(maxsize=64)
+def _script_model(segment: type[Segment], keys: tuple) -> type[BaseModel]:
+    return create_model(
+        f"{segment.__name__}Script",
+        __config__=ConfigDict(extra="allow"),
+        **{key: (segment, ...) for key in keys}
+    )
+
+def _fill_times(script: dict, rubric: Rubric) -> bool:
+    """Fill a missing segment time from the prompt's own timeline."""
+    filled = False
+    for key, (start, end) in rubric.segments.items():
+        segment = script.get(key)
+        if isinstance(segment, dict) and not segment.get("time"):
+            segment["time"] = f"{start:g}–{end:g}s"
+            filled = True
+    return filled
+
+def _invalid_keys(error: ValidationError, keys) -> list[str]:
+    bad = {str(e["loc"][0]) for e in error.errors() if e["loc"]}
+    return [key for key in keys if key in bad]
+
+def validate_script(data, segment: type[Segment], rubric: Rubric) -> tuple[dict, list[str]]:
+    """Normalize and validate a parsed script; returns (script, repairs) or raises ScriptValidationError."""
+    script, repairs = normalize_script(data, FIELD_ALIASES)
+    if not isinstance(script, dict):
+        raise ScriptValidationError("Model output is not a JSON object", missing=list(rubric.segments))
+    if _fill_times(script, rubric):
+        repairs.append("time_from_prompt")
+    try:
+        model = _script_model(segment, tuple(rubric.segments)).model_validate(script)
+    except ValidationError as e:
+        missing = _invalid_keys(e, rubric.segments)
+        valid = {k: v for k, v in script.items() if k not in missing}
+        raise ScriptValidationError(f"Script failed validation: {e.error_count()} error(s) in {', '.join(missing) or 'script'}", partial=valid, missing=missing) from e
+    return model.model_dump(), repairs
+
+def parse_script(content: str, segment: type[Segment], rubric: Rubric) -> tuple[dict, list[str]]:
+    """Parse raw model output into a validated script, repairing locally where possible.
+
+    Returns (script, repairs) where `repairs` names each local fix applied
+    (empty when the output was valid as-is).
+    """
+    try:
+        data, repairs = repair_json(content)
+    except json.JSONDecodeError as e:
+        raise ScriptValidationError(f"Unparseable JSON: {e}", missing=list(rubric.segments)) from e
+    script, normalized = validate_script(data, segment, rubric)
+    return script, repairs + normalized
+
+def parse_segment(content: str, segment_key: str, segment: type[Segment], time: str = None) -> dict:
+    """Parse a single regenerated segment ({"segment_n": {...}} or the bare object).
+
+    `time` pins the segment to its original slot whatever the model returned.
+    """
+    try:
+        data, _ = repair_json(content)
+    except json.JSONDecodeError as e:
+        raise ScriptValidationError(f"Unparseable JSON: {e}") from e
+    if isinstance(data, dict) and len(data) == 1 and isinstance(next(iter(data.values())), dict):
+        data = next(iter(data.values()))
+    if not isinstance(data, dict):
+        raise ScriptValidationError(f"Model did not return a usable {segment_key}")
+    data = normalize_segment_keys(data, FIELD_ALIASES)
+    if time:
+        data["time"] = time
+    try:
+        return segment.model_validate(data).model_dump()
+    except ValidationError as e:
+        raise ScriptValidationError(f"Model did not return a usable {segment_key}: {e.error_count()} error(s)") from e
+
+def complete_script(partial: dict, missing: list, content: str, segment: type[Segment], rubric: Rubric) -> tuple[dict, list[str]]:
+    """Merge a follow-up reply holding only the missing segments into the partial script and validate."""
+    try:
+        data, repairs = repair_json(content)
+    except json.JSONDecodeError as e:
+        raise ScriptValidationError(f"Unparseable follow-up JSON: {e}", partial=partial) from e
+    patch, normalized = normalize_script(data, FIELD_ALIASES)
+    if not isinstance(patch, dict):
+        raise ScriptValidationError("Follow-up is not a JSON object", partial=partial)
+    # A single missing segment often comes back bare rather than under its key
+    if len(missing) == 1 and "scene_description" in normalize_segment_keys(patch, FIELD_ALIASES):
+        patch = {missing[0]: patch}
+    script, validated = validate_script({**(partial or {}), **patch}, segment, rubric)
+    return script, repairs + normalized + validated
@@ -0,0 +1,113 @@
+import re
+
+# Fields every segment must fill in
+REQUIRED_FIELDS = ("time", "scene_description", "voiceover", "on_screen_text")
+
+_RANGE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*[–—-]\s*(\d+(?:\.\d+)?)\s*s")
+_STRUCTURE_RE = re.compile(r'"(segment_\d+)"\s*:\s*"([^"]+)"')
+_WORD_RULE_RE = re.compile(r"(\d+)\s*[–—-]\s*(\d+)\s*words\s+per\s+(\d+)\s*s", re.IGNORECASE)
+_WORD_RE = re.compile(r"[\w’']+")
+
+def parse_time_range(value) -> tuple[float, float]:
+    """'8–16s' -> (8.0, 16.0); None if it doesn't look like a range."""
+    match = _RANGE_RE.search(str(value or ""))
+    if not match:
+        return None
+    return float(match.group(1)), float(match.group(2))
+
+class Rubric:
+    """What a good script looks like for one prompt style, read from the prompt text itself."""
+
+    def __init__(self, segments: dict, words_per: tuple = None):
+        # {"segment_1": (0.0, 8.0), ...} in order
+        self.segments = segments
+        # (min_words, max_words, seconds) or None when the style doesn't require narration
+        self.words_per = words_per
+
+    @classmethod
+    def from_prompt(cls, prompt_text: str) -> "Rubric":
+        segments = {}
+        for key, value in _STRUCTURE_RE.findall(prompt_text):
+            span = parse_time_range(value)
+            if span and key not in segments:
+                segments[key] = span
+        if not segments:
+            segments = {"segment_1": (0.0, 8.0), "segment_2": (8.0, 16.0), "segment_3": (16.0, 24.0), "segment_4": (24.0, 30.0)}
+        rule = _WORD_RULE_RE.search(prompt_text)
+        words_per = (int(rule.group(1)), int(rule.group(2)), int(rule.group(3))) if rule else None
+        return cls(segments, words_per)
+
+def _word_rate_score(voiceover: str, duration: float, words_per: tuple) -> float:
+    lo, hi, seconds = words_per
+    lo, hi = lo * duration / seconds, hi * duration / seconds
+    words = len(_WORD_RE.findall(voiceover))
+    if lo <= words <= hi:
+        return 1.0
+    # Linear falloff, reaching 0 when the count is off by the upper target itself
+    miss = (lo - words) if words < lo else (words - hi)
+    return max(0.0, 1.0 - miss / max(1.0, hi))
+
+def score_script(script: dict, rubric: Rubric) -> tuple[float, dict]:
+    """Score a script in [0, 1] on schema completeness, voiceover pacing and segment timing.
+
+    Returns (score, report) where the report breaks the score down per check.
+    """
+    if not isinstance(script, dict):
+        return 0.0, {"completeness": 0.0, "pacing": 0.0, "timing": 0.0, "problems": ["not an object"]}
+
+    problems = []
+    filled = 0
+    pacing = []
+    timing = []
+    previous_end = None
+    for key, (expected_start, expected_end) in rubric.segments.items():
+        segment = script.get(key)
+        if not isinstance(segment, dict):
+            problems.append(f"{key} missing")
+            if rubric.words_per:
+                pacing.append(0.0)
+            timing.append(0.0)
+            continue
+
+        for field in REQUIRED_FIELDS:
+            value = segment.get(field)
+            if isinstance(value, str) and value.strip():
+                filled += 1
+            else:
+                problems.append(f"{key}.{field} empty")
+
+        span = parse_time_range(segment.get("time"))
+        if span is None:
+            problems.append(f"{key}.time unparseable")
+            timing.append(0.0)
+            span = (expected_start, expected_end)
+        else:
+            contiguous = previous_end is None or abs(span[0] - previous_end) < 0.5
+            matches = abs(span[0] - expected_start) < 0.5 and abs(span[1] - expected_end) < 0.5
+            timing.append(1.0 if matches else 0.5 if contiguous and span[1] > span[0] else 0.0)
+            if not matches:
+                problems.append(f"{key}.time {segment.get('time')} (expected {expected_start:g}–{expected_end:g}s)")
+        previous_end = span[1]
+
+        if rubric.words_per:
+            voiceover = str(segment.get("voiceover") or "")
+            rate = _word_rate_score(voiceover, span[1] - span[0], rubric.words_per)
+            if rate < 1.0:
+                problems.append(f"{key}.voiceover {len(_WORD_RE.findall(voiceover))} words")
+            pacing.append(rate)
+
+    expected = len(rubric.segments)
+    extra = [k for k in script if k.startswith("segment_") and k not in rubric.segments]
+    if extra:
+        problems.append(f"unexpected {', '.join(extra)}")
+
+    completeness = filled / (expected * len(REQUIRED_FIELDS)) * (expected / (expected + len(extra)))
+    pacing_score = sum(pacing) / len(pacing) if pacing else 1.0
+    timing_score = sum(timing) / len(timing) if timing else 0.0
+    score = 0.4 * completeness + 0.35 * pacing_score + 0.25 * timing_score
+    return round(score, 4), {
+        "completeness": round(completeness, 3),
+        "pacing": round(pacing_score, 3),
+        "timing": round(timing_score, 3),
+        "problems": problems,
+    }
@@ -0,0 +1,55 @@
+import json
+import os
+import zlib
+
+# Store new Script bodies compressed; existing JSON rows stay readable either way
+SCRIPT_CONTENT_COMPRESSION = os.getenv("SCRIPT_CONTENT_COMPRESSION", "true").lower() in ("1", "true", "yes")
+SCRIPT_CONTENT_LEVEL = int(os.getenv("SCRIPT_CONTENT_LEVEL", "9"))
+
+# Preset dictionary seeded with the structure and stock phrasing of our
+# scripts. Every script repeats the same keys, timings and cinematic
+# vocabulary, which a small standalone zlib stream can't exploit on its own.
+# zlib weights the end of the dictionary most, so the densest material is last.
+# v1 is hand-written, not trained: there was no script corpus to train on. On
+# the shipped prompts' example outputs it gives 2.2-2.4x against ~1.9x for
+# plain zlib. build_zdict.py trains a replacement from stored scripts and
+# reports its held-out ratio; ship that as a new version.
+# NEVER edit a published dictionary: add a new version and keep the old one
+# so existing rows still decode.
+_ZDICT_V1 = (
+    "camera slowly pushes in close-up shot wide shot of the warm golden light soft focus "
+    "background music swells cinematic slow motion as he she they looks at the camera and smiles "
+    "Call to action: follow for more Don't miss it Try it today Link in bio "
+    "Imagine a world where every moment feels like this. This is your sign to start. "
+    "transition to cut to fade to black fade in from the kitchen the city at night the morning sun "
+    '"voiceover":"I","on_screen_text":"","scene_description":"The camera ","time":"0–8s"},'
+    '"time":"8–16s","time":"16–24s","time":"24–30s"'
+    '{"segment_1":{"time":"0–8s","scene_description":"","voiceover":"","on_screen_text":""},'
+    '"segment_2":{"time":"8–16s","scene_description":"","voiceover":"","on_screen_text":""},'
+    '"segment_3":{"time":"16–24s","scene_description":"","voiceover":"","on_screen_text":""},'
+    '"segment_4":{"time":"24–30s","scene_description":"","voiceover":"","on_screen_text":""}}'
+).encode('utf-8')
+
+# Header byte identifies the dictionary a blob was compressed with
+_DICTIONARIES = {1: _ZDICT_V1}
+CURRENT_DICTIONARY = 1
+
+def pack_content(content) -> bytes:
+    """Compress a script body to the binary column format."""
+    data = json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    compressor = zlib.compressobj(SCRIPT_CONTENT_LEVEL, zdict=_DICTIONARIES[CURRENT_DICTIONARY])
+    return bytes([CURRENT_DICTIONARY]) + compressor.compress(data) + compressor.flush()
+
+def unpack_content(packed: bytes):
+    """Inverse of pack_content."""
+    version = packed[0]
+    if version not in _DICTIONARIES:
+        raise ValueError(f"Unknown script content dictionary version {version}")
+    decompressor = zlib.decompressobj(zdict=_DICTIONARIES[version])
+    return json.loads(decompressor.decompress(packed[1:]) + decompressor.flush())
+
+def content_columns(content) -> dict:
+    """Column values for a Script body, for bulk inserts that bypass the model property."""
+    if SCRIPT_CONTENT_COMPRESSION and content is not None:
+        return {"content_json": None, "content_packed": pack_content(content)}
+    return {"content_json": content, "content_packed": None}
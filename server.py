@@ -1,19 +1,31 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, status
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Request, Response, status
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from pathlib import Path
 from generator import ScriptGenerator
+from schemas import ScriptValidationError
+from presenters import LogPresenter
+from prompt_registry import PromptRegistry
 import os
-import pypdf
-import io
-from sqlalchemy.orm import Session
-from database import engine, get_db, Base
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import engine, get_async_db, AsyncSessionLocal, Base
 from models import Script, User
+from jobs import JobQueue, TERMINAL_STATUSES
+from extraction import ReferenceExtractor, UploadTooLarge, MAX_UPLOAD_BYTES
+from retrieval import ReferenceRetriever
+from persistence import ScriptWriter
+from scheduler import FairScheduler, RateLimited
+from budget import RequestBudget, GENERATE_TIMEOUT_SECONDS, STREAM_TIMEOUT_SECONDS, DISCONNECT_POLL_SECONDS
+import asyncio
+import base64
+import time
+from datetime import datetime
 import json
 import auth
 from fastapi.security import OAuth2PasswordRequestForm
-from auth import get_current_user
+from auth import get_current_user, Principal
 
 app = FastAPI()
 
@@ -24,13 +36,18 @@ if engine:
     except Exception as e:
         print(f"DB Error: {e}")
 
+# Prompt files are loaded once and hot-reloaded on change
+prompt_registry = PromptRegistry(Path.cwd())
+
 # Initialize Generator
 prompt_location = Path.cwd() / "prompt.txt"
 try:
     generator = ScriptGenerator(
         base_url="https://api.deepseek.com",
         model="deepseek-chat",
-        system_prompt_path=prompt_location
+        system_prompt_path=prompt_location,
+        prompt_registry=prompt_registry,
+        presenter=LogPresenter()
     )
 except Exception as e:
     print(f"Failed to initialize generator: {e}")
@@ -39,6 +56,76 @@ except Exception as e:
 else:
     init_error = None
 
+# Reference file parsing (process pool + content-hash cache)
+extractor = ReferenceExtractor()
+# Keeps only the passages relevant to each request from large references
+retriever = ReferenceRetriever()
+
+# Write-behind persistence so responses never wait on the DB or disk
+script_writer = ScriptWriter(
+    file_sink=lambda record: generator.save_script(record["content"], record["prompt"], record["user_id"]) if generator else None
+)
+
+# Most candidates a single /api/generate call may request
+GENERATE_MAX_CANDIDATES = int(os.getenv("GENERATE_MAX_CANDIDATES", "5"))
+
+# Admission control and fair queuing in front of every LLM call
+scheduler = FairScheduler()
+
+# Background generation jobs
+job_queue = JobQueue(generator, scheduler=scheduler) if generator and engine else None
+
+@app.on_event("startup")
+async def start_background_services():
+    prompt_registry.start_watching()
+    if engine:
+        script_writer.start()
+    if job_queue:
+        job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    if job_queue:
+        await job_queue.stop()
+    await script_writer.stop()
+    extractor.shutdown()
+    auth.shutdown_hashing()
+    prompt_registry.stop_watching()
+
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request, exc: RateLimited):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+# Multipart overhead allowed on top of the file itself (form fields, boundaries)
+UPLOAD_FORM_OVERHEAD_BYTES = 1024 * 1024
+
+class RejectOversizedUploads:
+    """Refuse oversized bodies from Content-Length before they are parsed.
+
+    Plain ASGI rather than @app.middleware("http"): the latter wraps `receive`
+    and hides client disconnects from the routes that watch for them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    if value.isdigit() and int(value) > MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD_BYTES:
+                        response = JSONResponse(status_code=413, content={"detail": "Upload too large"})
+                        await response(scope, receive, send)
+                        return
+                    break
+        await self.app(scope, receive, send)
+
+app.add_middleware(RejectOversizedUploads)
+
 # Mount static files
 static_dir = Path.cwd() / "static"
 static_dir.mkdir(exist_ok=True)
@@ -46,30 +133,43 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 
 @app.get("/api/prompts")
 async def get_prompts():
-    return {"prompts": ScriptGenerator.get_available_prompts()}
+    return {"prompts": prompt_registry.names(), "hashes": prompt_registry.hashes()}
+
+async def _get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
 
 @app.post("/api/register")
-async def register(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
+async def register(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await _get_user_by_username(db, form_data.username)
     if user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    hashed_password = auth.get_password_hash(form_data.password)
+    hashed_password = await auth.get_password_hash_async(form_data.password)
     new_user = User(username=form_data.username, hashed_password=hashed_password)
     db.add(new_user)
-    db.commit()
+    await db.commit()
+    # A previous account with this name may still be cached
+    auth.invalidate_user(new_user.username)
     return {"msg": "User created successfully"}
 
 @app.post("/api/login")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await _get_user_by_username(db, form_data.username)
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await auth.verify_and_update_async(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = auth.create_access_token(data={"sub": user.username})
+    if new_hash:
+        # Cost parameters changed since this hash was made; upgrade it now that we have the password
+        user.hashed_password = new_hash
+        await db.commit()
+    access_token = auth.create_access_token(data={"sub": user.username, "uid": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/")
@@ -80,29 +180,160 @@ async def read_index():
 async def read_login():
     return FileResponse('static/login.html')
 
-@app.get("/api/history")
+# Largest history page a client may ask for
+HISTORY_PAGE_MAX = 100
+
+def _encode_cursor(created_at: datetime, script_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{script_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, script_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(script_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.get("/api/history")
 async def get_history(
-    limit: int = 50, 
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    limit: int = 20, 
+    cursor: str = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    scripts = db.query(Script).filter(Script.user_id == str(current_user.id)).order_by(Script.created_at.desc()).limit(limit).all()
-    return scripts
+    """One page of the user's scripts, newest first, without their content."""
+    limit = max(1, min(limit, HISTORY_PAGE_MAX))
+    query = select(Script.id, Script.title, Script.created_at, Script.generation_type).where(
+        Script.user_id == current_user.id
+    )
+    if cursor:
+        # Keyset pagination: continue strictly after the last row of the previous page
+        created_at, script_id = _decode_cursor(cursor)
+        query = query.where(tuple_(Script.created_at, Script.id) < tuple_(created_at, script_id))
+    query = query.order_by(Script.created_at.desc(), Script.id.desc()).limit(limit + 1)
 
-@app.post("/api/generate")
-async def generate_script(
-    prompt: str = Form(...),
-    prompt_file: str = Form(None),
-    file: UploadFile = File(None),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    rows = (await db.execute(query)).all()
+    items = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = _encode_cursor(last.created_at, last.id)
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/api/scripts/{script_id}")
+async def get_script(
+    script_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    result = await db.execute(
+        select(Script).where(Script.id == script_id, Script.user_id == current_user.id)
+    )
+    script = result.scalars().first()
+    if script is None:
+        raise HTTPException(status_code=404, detail="Script not found")
+    return {
+        "id": script.id,
+        "title": script.title,
+        "prompt": script.prompt,
+        "prompt_file": script.prompt_file,
+        "input_filename": script.input_filename,
+        "content": script.content,
+        "created_at": script.created_at,
+        "generation_type": script.generation_type,
+        "user_id": script.user_id,
+        "parent_id": script.parent_id,
+        "version": script.version,
+    }
+
+def _check_generator():
     if not generator:
         detail_msg = "Generator not initialized"
         if init_error:
             detail_msg += f": {init_error}"
         raise HTTPException(status_code=500, detail=detail_msg)
+
+class ClientDisconnected(Exception):
+    """The client went away while its request was still being served."""
+
+async def _await_or_cancel(request: Request, awaitable, timeout: float):
+    """Await `awaitable`, cancelling it if the client disconnects or `timeout` runs out."""
+    task = asyncio.ensure_future(awaitable)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise HTTPException(status_code=504, detail="Request timed out")
+            done, _ = await asyncio.wait({task}, timeout=min(DISCONNECT_POLL_SECONDS, remaining))
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+async def _read_reference(file: UploadFile, prompt: str, timeout: float = None) -> str:
+    """Extract an uploaded PDF or text file and keep the passages relevant to the prompt."""
+    try:
+        text, digest = await asyncio.wait_for(extractor.extract_upload(file), timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Reference extraction timed out")
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to process file: {str(e)}")
+    return await asyncio.to_thread(retriever.select, digest, text, prompt)
+
+def _resolve_prompt_path(prompt_file: str):
+    """Validate a prompt filename from the client and return its path."""
+    if not prompt_file:
+        return None
+    # Basic security check
+    if ".." in prompt_file or "/" in prompt_file or "\\" in prompt_file:
+        raise HTTPException(status_code=400, detail="Invalid prompt filename")
+    
+    try:
+        return prompt_registry.get(prompt_file).path
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Prompt file not found")
+
+def _enqueue_script(prompt: str, result: dict, input_type: str, filename_str: str, user_id, prompt_file: str = None):
+    """Hand a generated script to the background writer; never raises into the request."""
+    try:
+        script_writer.submit(
+            title=prompt[:30],
+            prompt=prompt,
+            content=result,
+            generation_type=input_type,
+            user_id=user_id,
+            input_filename=filename_str,
+            prompt_file=prompt_file
+        )
+    except Exception as e:
+        print(f"CRITICAL: Failed to queue script for saving: {e}")
+
+@app.post("/api/generate")
+async def generate_script(
+    request: Request,
+    response: Response,
+    prompt: str = Form(...),
+    prompt_file: str = Form(None),
+    file: UploadFile = File(None),
+    no_cache: bool = Form(False),
+    n: int = Form(1),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Generate a script. With n > 1, candidates are generated in parallel and the best-scoring one is returned."""
+    _check_generator()
+    if not 1 <= n <= GENERATE_MAX_CANDIDATES:
+        raise HTTPException(status_code=400, detail=f"n must be between 1 and {GENERATE_MAX_CANDIDATES}")
+    # Each candidate is a provider call, so charge and queue it as n requests
+    scheduler.admit(current_user.id, n)
+    budget = RequestBudget(GENERATE_TIMEOUT_SECONDS)
     
     try:
         # Handle File Upload (RAG)
@@ -113,71 +344,291 @@ async def generate_script(
         if file:
             input_type = "file"
             filename_str = file.filename
-            try:
-                contents = await file.read()
-                filename = file.filename.lower()
-                
-                if filename.endswith('.pdf'):
-                    # Parse PDF
-                    pdf_file = io.BytesIO(contents)
-                    reader = pypdf.PdfReader(pdf_file)
-                    text = ""
-                    for page in reader.pages:
-                        text += page.extract_text() + "\n"
-                    reference_content = text
-                else:
-                    # Assume text/md
-                    reference_content = contents.decode('utf-8')
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Failed to process file: {str(e)}")
+            reference_content = await _read_reference(file, prompt, budget.extraction())
 
         # Handle System Prompt File
-        system_prompt_path = None
-        if prompt_file:
-             current_dir = Path.cwd()
-             # Basic security check
-             if ".." in prompt_file or "/" in prompt_file or "\\" in prompt_file:
-                 raise HTTPException(status_code=400, detail="Invalid prompt filename")
-             
-             system_prompt_path = current_dir / prompt_file
-             if not system_prompt_path.exists():
-                 raise HTTPException(status_code=404, detail="Prompt file not found")
-
-        result = generator.generate_json_script(prompt, system_prompt_path, reference_content)
+        system_prompt_path = _resolve_prompt_path(prompt_file)
+
+        async def generate():
+            # Queue wait counts against the budget too, and is abandoned with the request
+            # One slot per concurrent provider call, so candidates count against the cap
+            async with scheduler.slot(current_user.id, cost=n, admit=False, slots=n) as waited:
+                if n > 1:
+                    candidates, meta = await generator.generate_candidates(
+                        prompt, system_prompt_path, reference_content, n=n, save=False, deadline=budget.llm()
+                    )
+                    return candidates, meta, waited
+                result, meta = await generator.generate_json_script_with_meta(
+                    prompt, system_prompt_path, reference_content, use_cache=not no_cache, save=False,
+                    deadline=budget.llm()
+                )
+            return result, meta, waited
+
+        result, meta, waited = await _await_or_cancel(request, generate(), budget.llm())
+        if n > 1:
+            candidates = result
+            result = candidates[0]["script"]
+            response.headers["X-Candidates"] = str(len(candidates))
+        response.headers["X-Queue-Wait-Ms"] = str(round(waited * 1000, 1))
+        response.headers["X-Cache"] = meta["cache"].upper()
+        response.headers["X-Generation-Time-Ms"] = str(meta["elapsed_ms"])
+        if "similarity" in meta:
+            response.headers["X-Cache-Similarity"] = str(meta["similarity"])
+        if meta.get("repairs"):
+            response.headers["X-Json-Repairs"] = ",".join(meta["repairs"])
+        if meta.get("completed"):
+            response.headers["X-Json-Completed"] = ",".join(meta["completed"])
         
-        # Save to DB
+        # Nobody will see a result for a closed connection, so don't keep it
+        if await request.is_disconnected():
+            raise ClientDisconnected()
+        # Persisted in the background (DB row + scripts/ file); only the winner is kept
+        _enqueue_script(prompt, result, input_type, filename_str, current_user.id, prompt_file)
+
+        if n > 1:
+            return {"script": result, "score": candidates[0]["score"], "candidates": candidates}
+        return result
+    except ClientDisconnected:
+        print(f"Client disconnected; cancelled generation for user {current_user.id}")
+        return Response(status_code=499)
+    except HTTPException:
+        raise
+    except ScriptValidationError as e:
+        # The provider answered, but not with a usable script
+        raise HTTPException(status_code=502, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/generate/stream")
+async def generate_script_stream(
+    request: Request,
+    prompt: str = Form(...),
+    prompt_file: str = Form(None),
+    file: UploadFile = File(None),
+    no_cache: bool = Form(False),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Stream segments as NDJSON lines while the script is being generated."""
+    _check_generator()
+    # Refuse before the 200 goes out; the slot itself is held inside the stream
+    scheduler.admit(current_user.id)
+    budget = RequestBudget(STREAM_TIMEOUT_SECONDS)
+
+    reference_content = None
+    input_type = "text"
+    filename_str = None
+    if file:
+        input_type = "file"
+        filename_str = file.filename
+        reference_content = await _read_reference(file, prompt, budget.extraction())
+
+    system_prompt_path = _resolve_prompt_path(prompt_file)
+    user_id = current_user.id
+
+    async def event_stream():
         try:
-            print("Attempting to save to DB...")
-            # Try to extract title
-            title = prompt[:30] # Default
-            segments = result.get('segments') or result.get('script') or result
-            
-            # Save
-            db_script = Script(
-                title=title,
-                prompt=prompt,
-                content=result,
-                generation_type=input_type,
-                input_filename=filename_str,
-                user_id=str(current_user.id)
-            )
-            db.add(db_script)
-            db.commit()
-            db.refresh(db_script)
-            print(f"Saved script to DB with ID: {db_script.id}")
+            async with scheduler.slot(user_id, admit=False) as waited:
+                events = generator.stream_json_script(
+                    prompt, system_prompt_path, reference_content, use_cache=not no_cache, save=False,
+                    deadline=budget.llm()
+                )
+                try:
+                    while True:
+                        # Starlette only notices a disconnect on the next write, so watch for it while waiting
+                        try:
+                            event, key, payload = await _await_or_cancel(request, events.__anext__(), budget.llm())
+                        except StopAsyncIteration:
+                            break
+                        if event == "segment":
+                            yield json.dumps({"event": "segment", "key": key, "segment": payload}) + "\n"
+                        else:
+                            # Same as /api/generate: a result nobody will see isn't kept
+                            if await request.is_disconnected():
+                                raise ClientDisconnected()
+                            _enqueue_script(prompt, payload, input_type, filename_str, user_id, prompt_file)
+                            key["queue_wait_ms"] = round(waited * 1000, 1)
+                            yield json.dumps({"event": "done", "script": payload, "meta": key}) + "\n"
+                finally:
+                    await events.aclose()
+        except ClientDisconnected:
+            print(f"Client disconnected; cancelled stream for user {user_id}")
+        except HTTPException as e:
+            yield json.dumps({"event": "error", "detail": e.detail}) + "\n"
         except Exception as e:
-            print(f"CRITICAL DB ERROR: Failed to save to DB: {e}")
-            import traceback
-            traceback.print_exc()
-            # Don't fail the request if DB fails, just log it
+            yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@app.post("/api/scripts/{script_id}/segments/{segment}/regenerate")
+async def regenerate_segment(
+    request: Request,
+    script_id: int,
+    segment: int,
+    instruction: str = Form(None),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Regenerate one segment of a saved script and save the result as a new version."""
+    _check_generator()
+    result = await db.execute(
+        select(Script).where(Script.id == script_id, Script.user_id == current_user.id)
+    )
+    original = result.scalars().first()
+    # Give the connection back before the LLM call; the loaded row stays readable
+    await db.close()
+    if original is None:
+        raise HTTPException(status_code=404, detail="Script not found")
+    content = original.content
+    segment_key = f"segment_{segment}"
+    if not isinstance(content, dict) or not isinstance(content.get(segment_key), dict):
+        raise HTTPException(status_code=404, detail="Segment not found")
+
+    # Use the style the script was made with, if that prompt still exists
+    system_prompt_path = None
+    if original.prompt_file:
+        try:
+            system_prompt_path = _resolve_prompt_path(original.prompt_file)
+        except HTTPException:
             pass
 
-        return result
+    scheduler.admit(current_user.id)
+    budget = RequestBudget(GENERATE_TIMEOUT_SECONDS)
+
+    async def regenerate():
+        async with scheduler.slot(current_user.id, admit=False):
+            return await generator.regenerate_segment(
+                content, segment_key, original.prompt or "", system_prompt_path,
+                instruction=instruction, deadline=budget.llm()
+            )
+
+    try:
+        new_segment = await _await_or_cancel(request, regenerate(), budget.llm())
+    except ClientDisconnected:
+        return Response(status_code=499)
     except HTTPException:
         raise
+    except ScriptValidationError as e:
+        # The provider answered, but not with a usable script
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    # Nobody will see a version made for a closed connection, so don't keep it
+    if await request.is_disconnected():
+        return Response(status_code=499)
+
+    # Same key order as the original so the script reads the same
+    updated = {key: (new_segment if key == segment_key else value) for key, value in content.items()}
+    version = Script(
+        title=original.title,
+        prompt=original.prompt,
+        prompt_file=original.prompt_file,
+        input_filename=original.input_filename,
+        content=updated,
+        generation_type=original.generation_type,
+        user_id=current_user.id,
+        parent_id=original.id,
+        version=(original.version or 1) + 1,
+    )
+    async with AsyncSessionLocal() as db:
+        db.add(version)
+        await db.commit()
+    return {
+        "id": version.id,
+        "parent_id": original.id,
+        "version": version.version,
+        "segment_key": segment_key,
+        "segment": new_segment,
+        "content": updated,
+    }
+
+@app.post("/api/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    prompt: str = Form(...),
+    prompt_file: str = Form(None),
+    file: UploadFile = File(None),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Queue a generation and return its job id immediately."""
+    _check_generator()
+    if not job_queue:
+        raise HTTPException(status_code=503, detail="Job queue not available")
+    scheduler.admit(current_user.id)
+
+    reference_content = None
+    input_type = "text"
+    filename_str = None
+    if file:
+        input_type = "file"
+        filename_str = file.filename
+        reference_content = await _read_reference(file, prompt)
+
+    # Validate now so bad input fails fast instead of inside a worker
+    _resolve_prompt_path(prompt_file)
+
+    return await asyncio.to_thread(
+        job_queue.submit,
+        prompt,
+        current_user.id,
+        prompt_file=prompt_file,
+        reference_content=reference_content,
+        input_filename=filename_str,
+        generation_type=input_type
+    )
+
+@app.get("/api/scheduler")
+async def scheduler_stats(current_user: Principal = Depends(get_current_user)):
+    """Queue depth, wait times and admission counters for the LLM scheduler."""
+    return scheduler.stats()
+
+@app.get("/api/providers")
+async def provider_stats(current_user: Principal = Depends(get_current_user)):
+    """Per-endpoint latency percentiles, error counts and hedging counters."""
+    _check_generator()
+    return generator.providers.stats()
+
+def _get_job_or_404(job_id: str, user_id) -> dict:
+    if not job_queue:
+        raise HTTPException(status_code=503, detail="Job queue not available")
+    job = job_queue.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    job = await asyncio.to_thread(_get_job_or_404, job_id, current_user.id)
+    if job["status"] == "succeeded" and job["script_id"] is not None:
+        script = await db.get(Script, job["script_id"])
+        job["result"] = script.content if script else None
+    return job
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, current_user: Principal = Depends(get_current_user)):
+    """Server-sent events feed that reports each job status change until it finishes."""
+    job = await asyncio.to_thread(_get_job_or_404, job_id, current_user.id)
+    user_id = current_user.id
+
+    async def event_stream():
+        current = job
+        last_status = None
+        while True:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                yield f"event: status\ndata: {json.dumps(current)}\n\n"
+            if current["status"] in TERMINAL_STATUSES:
+                break
+            await asyncio.sleep(1)
+            current = await asyncio.to_thread(job_queue.get, job_id, user_id)
+            if current is None:
+                break
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="localhost", port=5436)
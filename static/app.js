@@ -178,7 +178,7 @@ document.addEventListener('DOMContentLoaded', () => {
             if (promptFile) formData.append('prompt_file', promptFile);
             if (selectedFile) formData.append('file', selectedFile);
             
-            const response = await fetch('/api/generate', {
+            const response = await fetch('/api/generate/stream', {
                 method: 'POST',
                 headers: {
                     'Authorization': `Bearer ${token}`
@@ -191,10 +191,50 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(errData.detail || 'Network response was not ok');
             }
 
-            const data = await response.json();
+            // Read NDJSON events and append each segment as soon as it arrives
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let segmentCount = 0;
+            let data = null;
+            const streamedSegments = {};
+
+            const handleEvent = (evt) => {
+                if (evt.event === 'segment') {
+                    segmentCount++;
+                    streamedSegments[evt.key] = evt.segment;
+                    appendSegmentCard(evt.key, evt.segment, segmentCount - 1, segmentCount);
+                    if (segmentCount === 1) {
+                        loadingState.classList.add('hidden');
+                        resultSection.classList.remove('hidden');
+                        resultSection.scrollIntoView({ behavior: 'smooth' });
+                    }
+                } else if (evt.event === 'done') {
+                    data = evt.script;
+                } else if (evt.event === 'error') {
+                    throw new Error(evt.detail || 'Generation failed');
+                }
+            };
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+            }
+            if (buffer.trim()) handleEvent(JSON.parse(buffer));
 
-            // Render Visual Script
-            renderVisualScript(data);
+            if (!data) {
+                throw new Error('Stream ended before the script was complete');
+            }
+
+            // Streamed cards are previews; re-render from the final script when the server
+            // validated, repaired or completed it, or if nothing was recognised while streaming
+            if (segmentCount === 0 || JSON.stringify(streamedSegments) !== JSON.stringify(data)) {
+                renderVisualScript(data);
+            }
 
             // Render Code
             jsonOutput.textContent = JSON.stringify(data, null, 4);
@@ -202,7 +242,9 @@ document.addEventListener('DOMContentLoaded', () => {
             resultSection.classList.remove('hidden');
 
             // Scroll to result
-            resultSection.scrollIntoView({ behavior: 'smooth' });
+            if (segmentCount === 0) {
+                resultSection.scrollIntoView({ behavior: 'smooth' });
+            }
 
         } catch (error) {
             console.error('Error:', error);
@@ -237,78 +279,10 @@ document.addEventListener('DOMContentLoaded', () => {
             // Heuristic to detect if this is a scene/segment object
             // 1. Key contains 'segment', 'scene', 'part' (case insensitive)
             // 2. OR Value is an object and has typical keys like 'visual', 'voiceover', 'scene_description'
-            
-            const lowerKey = key.toLowerCase();
-            const isNamedSegment = lowerKey.includes('segment') || lowerKey.includes('scene') || lowerKey.includes('part');
-            
-            const hasContent = typeof segment === 'object' && segment !== null && 
-                             (segment.scene_description || segment.visual || segment.voiceover || segment.audio);
-            
-            if (!isNamedSegment && !hasContent) return;
+            if (!isSegmentEntry(key, segment)) return;
 
             validSegmentCount++;
-            
-            const card = document.createElement('div');
-            card.className = 'script-card';
-            card.style.animationDelay = `${validSegmentCount * 0.1}s`;
-            
-            const time = segment.time || segment.duration || segment.timestamp || `Scene ${validSegmentCount}`;
-            
-            card.innerHTML = `
-                <div class="card-header">
-                    <div style="display: flex; align-items: center; gap: 0.5rem;">
-                        <span class="segment-title">Scene ${validSegmentCount}</span>
-                        <span class="time-badge"><i class="far fa-clock"></i> ${time}</span>
-                    </div>
-                    <button class="mini-copy-btn segment-copy-btn" title="Copy Entire Scene" data-segment-index="${index}">
-                        <i class="far fa-copy"></i>
-                    </button>
-                </div>
-                <div class="card-body">
-                    <div class="script-element">
-                        <div class="element-icon" title="Visual Description">
-                            <i class="fas fa-video"></i>
-                        </div>
-                        <div class="element-content">
-                            <div class="element-header">
-                                <h4>Visual</h4>
-                                <button class="mini-copy-btn" title="Copy Visual"><i class="far fa-copy"></i></button>
-                            </div>
-                            <p class="visual-text">${segment.scene_description || segment.description || segment.visual || 'N/A'}</p>
-                        </div>
-                    </div>
-                    
-                    <div class="script-element">
-                        <div class="element-icon" title="Voiceover">
-                            <i class="fas fa-microphone-alt"></i>
-                        </div>
-                        <div class="element-content">
-                            <div class="element-header">
-                                <h4>Audio / Voiceover</h4>
-                                <button class="mini-copy-btn" title="Copy Audio"><i class="far fa-copy"></i></button>
-                            </div>
-                            <p class="audio-text">"${segment.voiceover || segment.narration || segment.audio || 'N/A'}"</p>
-                        </div>
-                    </div>
-                    
-                    <div class="script-element">
-                        <div class="element-icon" title="On-Screen Text">
-                            <i class="fas fa-quote-left"></i>
-                        </div>
-                        <div class="element-content">
-                             <div class="element-header">
-                                <h4>Overlay Text</h4>
-                                <button class="mini-copy-btn" title="Copy Text"><i class="far fa-copy"></i></button>
-                            </div>
-                            <p class="overlay-text">${segment.on_screen_text || segment.text || 'N/A'}</p>
-                        </div>
-                    </div>
-                </div>
-            `;
-            
-            // Store segment data for easy copying
-            card.dataset.segmentData = JSON.stringify(segment);
-            visualOutput.appendChild(card);
+            appendSegmentCard(key, segment, index, validSegmentCount);
         });
 
         // Fallback if no segments found
@@ -326,6 +300,80 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    function isSegmentEntry(key, segment) {
+        const lowerKey = key.toLowerCase();
+        const isNamedSegment = lowerKey.includes('segment') || lowerKey.includes('scene') || lowerKey.includes('part');
+        
+        const hasContent = typeof segment === 'object' && segment !== null && 
+                         (segment.scene_description || segment.visual || segment.voiceover || segment.audio);
+        
+        return isNamedSegment || hasContent;
+    }
+
+    function appendSegmentCard(key, segment, index, validSegmentCount) {
+        const card = document.createElement('div');
+        card.className = 'script-card';
+        card.style.animationDelay = `${validSegmentCount * 0.1}s`;
+
+        const time = segment.time || segment.duration || segment.timestamp || `Scene ${validSegmentCount}`;
+
+        card.innerHTML = `
+            <div class="card-header">
+                <div style="display: flex; align-items: center; gap: 0.5rem;">
+                    <span class="segment-title">Scene ${validSegmentCount}</span>
+                    <span class="time-badge"><i class="far fa-clock"></i> ${time}</span>
+                </div>
+                <button class="mini-copy-btn segment-copy-btn" title="Copy Entire Scene" data-segment-index="${index}">
+                    <i class="far fa-copy"></i>
+                </button>
+            </div>
+            <div class="card-body">
+                <div class="script-element">
+                    <div class="element-icon" title="Visual Description">
+                        <i class="fas fa-video"></i>
+                    </div>
+                    <div class="element-content">
+                        <div class="element-header">
+                            <h4>Visual</h4>
+                            <button class="mini-copy-btn" title="Copy Visual"><i class="far fa-copy"></i></button>
+                        </div>
+                        <p class="visual-text">${segment.scene_description || segment.description || segment.visual || 'N/A'}</p>
+                    </div>
+                </div>
+
+                <div class="script-element">
+                    <div class="element-icon" title="Voiceover">
+                        <i class="fas fa-microphone-alt"></i>
+                    </div>
+                    <div class="element-content">
+                        <div class="element-header">
+                            <h4>Audio / Voiceover</h4>
+                            <button class="mini-copy-btn" title="Copy Audio"><i class="far fa-copy"></i></button>
+                        </div>
+                        <p class="audio-text">"${segment.voiceover || segment.narration || segment.audio || 'N/A'}"</p>
+                    </div>
+                </div>
+
+                <div class="script-element">
+                    <div class="element-icon" title="On-Screen Text">
+                        <i class="fas fa-quote-left"></i>
+                    </div>
+                    <div class="element-content">
+                         <div class="element-header">
+                            <h4>Overlay Text</h4>
+                            <button class="mini-copy-btn" title="Copy Text"><i class="far fa-copy"></i></button>
+                        </div>
+                        <p class="overlay-text">${segment.on_screen_text || segment.text || 'N/A'}</p>
+                    </div>
+                </div>
+            </div>
+        `;
+
+        // Store segment data for easy copying
+        card.dataset.segmentData = JSON.stringify(segment);
+        visualOutput.appendChild(card);
+    }
+
     // Event delegation for mini copy buttons
     visualOutput.addEventListener('click', async (e) => {
         const btn = e.target.closest('.mini-copy-btn');
@@ -473,38 +521,69 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
-    async function fetchHistory() {
-        historyList.innerHTML = '<div style="text-align:center; opacity:0.6; padding:1rem;">Loading...</div>';
+    // Keyset pagination state for the history sidebar
+    let historyCursor = null;
+    let historyLoading = false;
+    let historyExhausted = false;
+
+    async function fetchHistory(append = false) {
+        if (historyLoading || (append && historyExhausted)) return;
+        historyLoading = true;
+        let loaded = false;
+        if (!append) {
+            historyCursor = null;
+            historyExhausted = false;
+            historyList.innerHTML = '<div style="text-align:center; opacity:0.6; padding:1rem;">Loading...</div>';
+        }
         try {
             console.log("Fetching history...");
-            const res = await fetch(`/api/history`, {
+            const params = new URLSearchParams({ limit: 20 });
+            if (append && historyCursor) params.set('cursor', historyCursor);
+            const res = await fetch(`/api/history?${params}`, {
                 headers: { 'Authorization': `Bearer ${token}` }
             });
             if (!res.ok) {
                 const txt = await res.text();
                 throw new Error(`Server Error (${res.status}): ${txt}`);
             }
-            const scripts = await res.json();
-            console.log("History loaded:", scripts.length);
-            renderHistoryList(scripts);
+            const page = await res.json();
+            console.log("History loaded:", page.items.length);
+            historyCursor = page.next_cursor;
+            historyExhausted = !page.next_cursor;
+            renderHistoryList(page.items, append);
+            loaded = true;
         } catch (err) {
             console.error("History Fetch Error:", err);
+            if (append) return;
             historyList.innerHTML = `
                 <div style="text-align:center; padding:1rem;">
                     <p style="opacity:0.6; margin-bottom:0.5rem; color:#f87171;">Failed to load history</p>
                     <button onclick="fetchHistory()" style="background:rgba(255,255,255,0.1); border:none; padding:4px 8px; border-radius:4px; color:white; cursor:pointer; font-size:0.8rem;">Retry</button>
                     <p style="font-size:0.7rem; margin-top:0.5rem; opacity:0.4;">${err.message}</p>
                 </div>`;
+        } finally {
+            historyLoading = false;
+        }
+        // Scrolling can't reach the next page if this one didn't fill the list, so keep going
+        if (loaded && !historyExhausted && historyList.scrollHeight <= historyList.clientHeight + 100) {
+            fetchHistory(true);
         }
     }
 
-    function renderHistoryList(scripts) {
-        if (scripts.length === 0) {
+    // Load the next page when the list is scrolled near its end
+    historyList.addEventListener('scroll', () => {
+        if (historyList.scrollTop + historyList.clientHeight >= historyList.scrollHeight - 100) {
+            fetchHistory(true);
+        }
+    });
+
+    function renderHistoryList(scripts, append = false) {
+        if (!append && scripts.length === 0) {
             historyList.innerHTML = '<div style="text-align:center; opacity:0.6; padding:1rem;">No history yet. Generate something!</div>';
             return;
         }
 
-        historyList.innerHTML = '';
+        if (!append) historyList.innerHTML = '';
         scripts.forEach(script => {
             const item = document.createElement('div');
             item.className = 'history-item';
@@ -514,7 +593,7 @@ document.addEventListener('DOMContentLoaded', () => {
             const timeStr = date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
             const dateStr = date.toLocaleDateString();
 
-            const isFile = script.input_type === 'file';
+            const isFile = script.generation_type === 'file';
             const icon = isFile ? '<i class="fas fa-file-alt"></i>' : '<i class="fas fa-keyboard"></i>';
             const badge = isFile ? '<span class="history-type-badge" style="background:rgba(236,72,153,0.2); color:#f472b6;">RAG</span>' : '<span class="history-type-badge">Text</span>';
 
@@ -527,7 +606,7 @@ document.addEventListener('DOMContentLoaded', () => {
             `;
             
             item.addEventListener('click', () => {
-                loadHistoryScript(script);
+                loadHistoryScript(script.id);
                 toggleSidebar(false);
             });
 
@@ -535,7 +614,23 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
-    function loadHistoryScript(script) {
+    async function loadHistoryScript(scriptId) {
+        // History entries are summaries; fetch the full script on demand
+        let script;
+        try {
+            const res = await fetch(`/api/scripts/${scriptId}`, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            if (!res.ok) {
+                throw new Error(`Server Error (${res.status})`);
+            }
+            script = await res.json();
+        } catch (err) {
+            console.error("Script Fetch Error:", err);
+            alert(`Failed to load script: ${err.message}`);
+            return;
+        }
+
         // Load content
         const data = script.content;
         
@@ -0,0 +1,117 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+SCRIPT_STORE_DIR = Path(os.getenv("SCRIPT_STORE_DIR", Path.cwd() / "scripts"))
+# gzip level for stored blobs; scripts are small, so higher levels buy little
+SCRIPT_STORE_COMPRESSLEVEL = int(os.getenv("SCRIPT_STORE_COMPRESSLEVEL", "6"))
+
+def canonical_json(content: dict) -> bytes:
+    """Compact, key-sorted encoding so identical scripts hash identically."""
+    return json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+class ScriptStore:
+    """Content-addressed store for generated scripts.
+
+    Each script is saved once as gzip'd canonical JSON under
+    objects/<aa>/<bb>/<sha256>.json.gz, so identical outputs share a blob and
+    lookup by id is a direct path computation regardless of how many files
+    exist. Writes go to a temp file in the target directory and are renamed
+    into place, so readers never see a partial blob. A SQLite index maps
+    blob ids to titles, prompts and users. Safe to call from worker threads.
+    """
+
+    def __init__(self, root: Path = SCRIPT_STORE_DIR, compresslevel: int = SCRIPT_STORE_COMPRESSLEVEL):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.compresslevel = compresslevel
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                blob TEXT NOT NULL,
+                title TEXT,
+                prompt TEXT,
+                user_id INTEGER,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_blob ON entries (blob)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_title ON entries (title)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_user_id ON entries (user_id, created_at)")
+        self._conn.commit()
+
+    def path_for(self, blob_id: str) -> Path:
+        return self.objects / blob_id[:2] / blob_id[2:4] / f"{blob_id}.json.gz"
+
+    def put(self, content: dict, title: str = None, prompt: str = None, user_id: int = None) -> tuple[str, Path]:
+        """Store a script and index it. Returns (blob_id, path); duplicate content reuses the existing blob."""
+        data = canonical_json(content)
+        blob_id = hashlib.sha256(data).hexdigest()
+        path = self.path_for(blob_id)
+        if not path.exists():
+            self._write_atomic(path, gzip.compress(data, compresslevel=self.compresslevel, mtime=0))
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO entries (blob, title, prompt, user_id, created_at) VALUES (?, ?, ?, ?, ?)",
+                (blob_id, title, prompt, user_id, time.time())
+            )
+            self._conn.commit()
+        return blob_id, path
+
+    def get(self, blob_id: str):
+        """Return the stored script, or None if the blob doesn't exist."""
+        try:
+            with open(self.path_for(blob_id), 'rb') as f:
+                return json.loads(gzip.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+
+    def find(self, title: str = None, user_id: int = None, limit: int = 20) -> list[dict]:
+        """Newest index entries matching a title and/or user."""
+        clauses, params = [], []
+        if title is not None:
+            clauses.append("title = ?")
+            params.append(title)
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, blob, title, prompt, user_id, created_at FROM entries {where}"
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*params, limit)
+            ).fetchall()
+        return [
+            {"id": r[0], "blob": r[1], "title": r[2], "prompt": r[3], "user_id": r[4], "created_at": r[5]}
+            for r in rows
+        ]
+
+    def _write_atomic(self, path: Path, payload: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            # Concurrent writers of the same blob produce identical bytes, so last rename wins harmlessly
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise
@@ -0,0 +1,84 @@
+import itertools
+import random
+import time
+from cache import ResponseCache, SemanticCache
+
+def test_memory_hits_keep_hot_keys_in_persistent_tier(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite", max_entries=10, memory_entries=4)
+    cache.put("hot", {"n": 0})
+    for i in range(20):
+        # Every read of "hot" is served from memory
+        assert cache.get("hot") == {"n": 0}
+        cache.put(f"cold-{i}", {"n": i})
+
+    # A fresh instance only sees the SQLite tier, as after a restart
+    restarted = ResponseCache(tmp_path / "responses.sqlite", max_entries=10, memory_entries=4)
+    assert restarted.get("hot") == {"n": 0}
+    assert restarted.get("cold-0") is None
+
+def test_semantic_cache_matches_rephrasings_only():
+    semantic = SemanticCache(None)
+    for i, prompt in enumerate(["spicy garlic butter steak", "short rib ragu", "chicken tikka masala", "lemon drizzle cake"]):
+        semantic.add("style", prompt, f"k{i}")
+
+    assert semantic.lookup("style", "Spicy garlic-butter steaks")[0] == "k0"
+    assert semantic.lookup("style", "short rib ragu recipe")[0] == "k1"
+    assert semantic.lookup("style", "short rib tacos")[0] is None
+    assert semantic.lookup("style", "steak")[0] is None
+    assert semantic.lookup("style", "lasagna")[0] is None
+    assert semantic.lookup("other-style", "spicy garlic butter steak")[0] is None
+
+def test_semantic_cache_matches_reordered_prompt_with_extra_word():
+    semantic = SemanticCache(None)
+    semantic.add("style", "garlic butter steak short", "k")
+    key, similarity = semantic.lookup("style", "steak with garlic butter")
+    assert key == "k" and similarity > 0.86
+
+def test_semantic_lookup_at_100k_prompts_is_sub_millisecond():
+    rng = random.Random(0)
+    # Zipf-distributed cooking vocabulary, so common words have postings in the tens of thousands
+    vocabulary = ("garlic butter steak chicken pasta lemon spicy crispy roasted grilled honey cheese creamy "
+                  "tomato salad soup rice beef pork healthy").split() + [f"dish{i}" for i in range(2000)]
+    cumulative = list(itertools.accumulate(1 / (i + 1) for i in range(len(vocabulary))))
+
+    def prompt():
+        return " ".join(rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(3, 7)))
+
+    semantic = SemanticCache(None)
+    for i in range(100_000):
+        semantic.add("style", prompt(), f"k{i}")
+    queries = [prompt() for _ in range(300)]
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        semantic.lookup("style", query)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    assert timings[len(timings) // 2] < 0.001
+
+def test_semantic_index_dedupes_and_follows_evictions(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite", max_entries=10, memory_entries=4)
+    semantic = SemanticCache(cache)
+    for _ in range(3):
+        cache.put("steak", {"n": 0}, style_hash="style", prompt="garlic butter steak")
+        semantic.add("style", "garlic butter steak", "steak")
+    assert len(semantic._indexes["style"]) == 1
+
+    for i in range(20):
+        cache.put(f"k{i}", {"n": i}, style_hash="style", prompt=f"dish number {i}")
+        semantic.add("style", f"dish number {i}", f"k{i}")
+    live = {row[0] for row in cache.iter_prompts()}
+    assert set(semantic._indexes["style"].slot_of) == live
+    assert semantic.lookup("style", "garlic butter steak")[0] is None
+
+def test_semantic_index_compacts_removed_prompts():
+    semantic = SemanticCache(None)
+    for i in range(3000):
+        semantic.add("style", f"dish{i} with house sauce", f"k{i}")
+    semantic.discard([f"k{i}" for i in range(0, 3000, 3)] + [f"k{i}" for i in range(1, 3000, 3)])
+    index = semantic._indexes["style"]
+    assert len(index) == 1000
+    assert len(index.keys) < 3000
+    assert semantic.lookup("style", "dish2 with house sauce")[0] == "k2"
+    assert semantic.lookup("style", "dish3 with house sauce")[0] is None
+    assert semantic.lookup("style", "dish2999 with house sauce")[0] == "k2999"
@@ -0,0 +1,48 @@
+import asyncio
+import os
+import pytest
+from extraction import ReferenceExtractor
+
+class FakeUpload:
+    def __init__(self, data: bytes, filename: str):
+        self._data = data
+        self.filename = filename
+
+    async def read(self, size: int) -> bytes:
+        chunk, self._data = self._data[:size], self._data[size:]
+        return chunk
+
+class SlowExtractor(ReferenceExtractor):
+    """Stands in for a busy pool: the spooled file is only opened after a delay."""
+
+    def __init__(self):
+        super().__init__()
+        self.paths = []
+
+    async def _run(self, path, filename):
+        self.paths.append(path)
+        await asyncio.sleep(0.2)
+        return await super()._run(path, filename)
+
+def test_shared_extraction_survives_cancelled_originator(tmp_path, monkeypatch):
+    monkeypatch.setattr("extraction.UPLOAD_SPOOL_DIR", str(tmp_path))
+
+    async def scenario():
+        extractor = SlowExtractor()
+        first = asyncio.create_task(extractor.extract_upload(FakeUpload(b"# Curry\nonions", "ref.md")))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(extractor.extract_upload(FakeUpload(b"# Curry\nonions", "ref.md")))
+        await asyncio.sleep(0.05)
+        # The request that started the extraction goes away (timeout or disconnect)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        text, _ = await second
+        await asyncio.sleep(0.1)
+        return extractor, text
+
+    extractor, text = asyncio.run(scenario())
+    assert text == "# Curry\nonions"
+    assert len(extractor.paths) == 1
+    # Every spooled copy is gone once the shared extraction has finished
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,175 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models import Job, Script
+from jobs import JobQueue
+
+SCRIPT = {"segment_1": {"time": "0–8s", "scene_description": "s", "voiceover": "v", "on_screen_text": "t"}}
+
+class FakeGenerator:
+    """In-process stand-in for ScriptGenerator."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def generate_json_script_async(self, prompt, system_prompt_path=None, reference_content=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("fake LLM down")
+        return SCRIPT
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+async def _wait_terminal(queue, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id, 1)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish: {job}")
+
+def test_submit_from_thread_wakes_worker(session_factory):
+    async def scenario():
+        generator = FakeGenerator()
+        # A long poll interval means only the wakeup can get the job picked up quickly
+        queue = JobQueue(generator, session_factory, num_workers=1, poll_interval=30)
+        queue.start()
+        try:
+            await asyncio.sleep(0.1)
+            job = await asyncio.to_thread(queue.submit, "steak", 1)
+            done = await _wait_terminal(queue, job["id"], timeout=3)
+        finally:
+            await queue.stop()
+        return generator, done
+
+    generator, done = asyncio.run(scenario())
+    assert done["status"] == "succeeded"
+    assert generator.calls == 1
+    db = session_factory()
+    assert db.get(Script, done["script_id"]).content == SCRIPT
+    db.close()
+
+def test_failures_retry_up_to_max_attempts(session_factory):
+    async def scenario():
+        generator = FakeGenerator(fail=True)
+        queue = JobQueue(generator, session_factory, num_workers=2, poll_interval=0.1, max_attempts=3)
+        queue.start()
+        try:
+            job = await asyncio.to_thread(queue.submit, "steak", 1)
+            done = await _wait_terminal(queue, job["id"])
+        finally:
+            await queue.stop()
+        return generator, done
+
+    generator, done = asyncio.run(scenario())
+    assert done["status"] == "failed"
+    assert done["attempts"] == 3
+    assert generator.calls == 3
+
+def test_heartbeat_keeps_long_job_from_being_reclaimed(session_factory):
+    async def scenario():
+        # The job runs for several lease periods; without renewal a second worker would re-run it
+        generator = FakeGenerator(delay=2.5)
+        queue = JobQueue(generator, session_factory, num_workers=2, poll_interval=0.1,
+                         lease_seconds=1, heartbeat_seconds=0.2)
+        queue.start()
+        try:
+            job = await asyncio.to_thread(queue.submit, "slow steak", 1)
+            done = await _wait_terminal(queue, job["id"])
+        finally:
+            await queue.stop()
+        return generator, done
+
+    generator, done = asyncio.run(scenario())
+    assert done["status"] == "succeeded"
+    assert done["attempts"] == 1
+    assert generator.calls == 1
+
+def test_stale_job_past_max_attempts_is_failed_not_rerun(session_factory):
+    db = session_factory()
+    stale = datetime.utcnow() - timedelta(hours=1)
+    db.add(Job(id="orphan", status="running", prompt="steak", user_id=1, attempts=3,
+               created_at=stale, started_at=stale, heartbeat_at=stale))
+    db.commit()
+    db.close()
+
+    async def scenario():
+        generator = FakeGenerator()
+        queue = JobQueue(generator, session_factory, num_workers=1, poll_interval=0.1,
+                         max_attempts=3, lease_seconds=60)
+        queue.start()
+        try:
+            done = await _wait_terminal(queue, "orphan")
+        finally:
+            await queue.stop()
+        return generator, done
+
+    generator, done = asyncio.run(scenario())
+    assert done["status"] == "failed"
+    assert done["attempts"] == 3
+    assert generator.calls == 0
+
+def test_stop_requeues_running_jobs_for_the_next_process(session_factory):
+    async def scenario():
+        slow = FakeGenerator(delay=30)
+        first = JobQueue(slow, session_factory, num_workers=1, poll_interval=0.1, lease_seconds=600)
+        first.start()
+        job = await asyncio.to_thread(first.submit, "steak", 1)
+        for _ in range(50):
+            if slow.calls:
+                break
+            await asyncio.sleep(0.05)
+        await first.stop()
+        requeued = first.get(job["id"], 1)
+
+        # A restarted process picks it up at once instead of waiting out the 600 s lease
+        generator = FakeGenerator()
+        second = JobQueue(generator, session_factory, num_workers=1, poll_interval=0.1, lease_seconds=600)
+        second.start()
+        try:
+            done = await _wait_terminal(second, job["id"], timeout=3)
+        finally:
+            await second.stop()
+        return requeued, done, generator
+
+    requeued, done, generator = asyncio.run(scenario())
+    assert requeued["status"] == "queued"
+    assert requeued["attempts"] == 0
+    assert done["status"] == "succeeded"
+    assert done["attempts"] == 1
+    assert generator.calls == 1
+
+def test_stop_during_a_claim_requeues_the_claimed_job(session_factory):
+    async def scenario():
+        queue = JobQueue(FakeGenerator(), session_factory, num_workers=1, poll_interval=30, lease_seconds=600)
+        claim = queue._claim
+
+        def slow_claim():
+            job = claim()
+            time.sleep(0.3)
+            return job
+
+        queue._claim = slow_claim
+        job = await asyncio.to_thread(queue.submit, "steak", 1)
+        queue.start()
+        await asyncio.sleep(0.1)
+        # The worker is cancelled while the claim (already committed) is still in its thread
+        await queue.stop()
+        return queue.get(job["id"], 1)
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "queued"
+    assert job["attempts"] == 0
@@ -0,0 +1,121 @@
+import json
+import pytest
+from json_repair import repair_json, normalize_script
+from schemas import (
+    FIELD_ALIASES, AsmrSegment, Segment, ScriptValidationError, complete_script, parse_script, parse_segment,
+)
+from scoring import Rubric
+
+RUBRIC = Rubric.from_prompt("")
+
+def _segment(n: int, **fields) -> dict:
+    start, end = RUBRIC.segments[f"segment_{n}"]
+    segment = {"time": f"{start:g}–{end:g}s", "scene_description": f"scene {n}",
+               "voiceover": f"line {n}", "on_screen_text": f"text {n}"}
+    segment.update(fields)
+    return segment
+
+SCRIPT = {f"segment_{n}": _segment(n) for n in range(1, 5)}
+
+def test_valid_json_needs_no_repairs():
+    assert repair_json(json.dumps(SCRIPT)) == (SCRIPT, [])
+
+@pytest.mark.parametrize("text, expected", [
+    # Mid-string: the unfinished value is dropped with its key
+    ('{"segment_1": {"time": "0–8s", "voiceover": "hello wor', {"segment_1": {"time": "0–8s"}}),
+    # Escaped quote inside the unfinished string doesn't end it early
+    ('{"segment_1": {"time": "0–8s", "voiceover": "he said \\"hi', {"segment_1": {"time": "0–8s"}}),
+    # Mid-key
+    ('{"segment_1": {"time": "0–8s"}, "segm', {"segment_1": {"time": "0–8s"}}),
+    # Key complete, value never started
+    ('{"segment_1": {"time": "0–8s"}, "segment_2": {"time"', {"segment_1": {"time": "0–8s"}, "segment_2": {}}),
+    # Mid-number: "12" might have been "120", so it is not trusted
+    ('{"a": 1, "b": 12', {"a": 1}),
+    ('{"a": [1, 2, 3', {"a": [1, 2]}),
+    ('{"a": [1, 2, 3 ', {"a": [1, 2, 3]}),
+])
+def test_truncated_output_is_cut_back_and_closed(text, expected):
+    assert repair_json(text) == (expected, ["truncation"])
+
+def test_trailing_commas_are_removed_outside_strings():
+    assert repair_json('{"a": 1, "b": {"c": [2, 3,],},}') == ({"a": 1, "b": {"c": [2, 3]}}, ["trailing_commas"])
+    assert repair_json('{"a": "x, }"  ,}') == ({"a": "x, }"}, ["trailing_commas"])
+
+@pytest.mark.parametrize("text, repairs", [
+    ("```json\n" + json.dumps(SCRIPT) + "\n```", ["fences"]),
+    ("```\n" + json.dumps(SCRIPT) + "\n```", ["fences"]),
+    ("Here is your script:\n" + json.dumps(SCRIPT), ["fences"]),
+    ("Here is your script:\n" + json.dumps(SCRIPT) + "\nEnjoy!", ["fences", "trailing_text"]),
+])
+def test_fenced_or_prose_wrapped_output(text, repairs):
+    assert repair_json(text) == (SCRIPT, repairs)
+
+def test_unparseable_output_still_raises():
+    with pytest.raises(json.JSONDecodeError):
+        repair_json("I can't write that script.")
+
+@pytest.mark.parametrize("data, repairs", [
+    ({"segments": list(SCRIPT.values())}, ["unwrapped", "list_to_segments"]),
+    ({"script": SCRIPT}, ["unwrapped"]),
+    (list(SCRIPT.values()), ["list_to_segments"]),
+    ({f"Segment {n}": _segment(n) for n in range(1, 5)}, ["segment_keys"]),
+])
+def test_structural_variants_become_segment_keys(data, repairs):
+    assert normalize_script(data, FIELD_ALIASES) == (SCRIPT, repairs)
+
+def test_aliased_fields_are_renamed_and_first_spelling_wins():
+    aliased = {"Timing": "0–8s", "Visual": "scene 1", "Narration": "line 1", "Text Overlay": "text 1", "VO": "ignored"}
+    script, repairs = normalize_script({"segment_1": aliased}, FIELD_ALIASES)
+    assert script == {"segment_1": _segment(1)}
+    assert repairs == ["field_aliases"]
+
+def test_parse_script_combines_repairs_and_fills_missing_times():
+    data = {"segments": [{k: v for k, v in _segment(n).items() if k != "time"} for n in range(1, 5)]}
+    script, repairs = parse_script("```json\n" + json.dumps(data) + "\n```", Segment, RUBRIC)
+    assert script == SCRIPT
+    assert repairs == ["fences", "unwrapped", "list_to_segments", "time_from_prompt"]
+
+def test_truncated_script_reports_partial_and_missing_segments():
+    text = json.dumps(SCRIPT)
+    cut = text[:text.index('"segment_3"') + 40]
+    with pytest.raises(ScriptValidationError) as raised:
+        parse_script(cut, Segment, RUBRIC)
+    assert raised.value.partial == {"segment_1": SCRIPT["segment_1"], "segment_2": SCRIPT["segment_2"]}
+    assert raised.value.missing == ["segment_3", "segment_4"]
+
+def test_complete_script_merges_follow_up_segments():
+    partial = {key: SCRIPT[key] for key in ("segment_1", "segment_2")}
+    follow_up = json.dumps({"segment_3": SCRIPT["segment_3"], "Segment 4": _segment(4)})
+    script, repairs = complete_script(partial, ["segment_3", "segment_4"], follow_up, Segment, RUBRIC)
+    assert script == SCRIPT
+    assert repairs == ["segment_keys"]
+
+def test_complete_script_accepts_a_bare_single_segment():
+    partial = {key: SCRIPT[key] for key in ("segment_1", "segment_2", "segment_3")}
+    bare = {"visual": "scene 4", "narration": "line 4", "caption": "text 4"}
+    script, repairs = complete_script(partial, ["segment_4"], "```json\n" + json.dumps(bare) + "\n```", Segment, RUBRIC)
+    assert script == SCRIPT
+    assert "time_from_prompt" in repairs
+
+def test_complete_script_keeps_partial_when_follow_up_is_unusable():
+    partial = {"segment_1": SCRIPT["segment_1"]}
+    with pytest.raises(ScriptValidationError) as raised:
+        complete_script(partial, ["segment_2"], "sorry", Segment, RUBRIC)
+    assert raised.value.partial == partial
+
+def test_follow_up_does_not_override_a_valid_segment_with_an_invalid_one():
+    partial = {key: SCRIPT[key] for key in ("segment_1", "segment_2", "segment_3")}
+    follow_up = json.dumps({"segment_4": _segment(4), "segment_1": {"time": "0–8s"}})
+    with pytest.raises(ScriptValidationError) as raised:
+        complete_script(partial, ["segment_4"], follow_up, Segment, RUBRIC)
+    assert raised.value.missing == ["segment_1"]
+
+def test_parse_segment_pins_time_and_unwraps_key():
+    segment = parse_segment(json.dumps({"segment_2": {"time": "99s", "scene": "new", "vo": "words", "caption": "t"}}),
+                            "segment_2", Segment, time="8–16s")
+    assert segment == {"time": "8–16s", "scene_description": "new", "voiceover": "words", "on_screen_text": "t"}
+
+def test_asmr_segments_need_audio_cues_but_not_narration():
+    segment = parse_segment(json.dumps({"scene": "s", "sfx": "sizzle", "caption": "t"}), "segment_1", AsmrSegment, time="0–8s")
+    assert segment["audio_cues"] == "sizzle"
+    assert segment["voiceover"] == "N/A"
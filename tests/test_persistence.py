@@ -0,0 +1,62 @@
+import asyncio
+import json
+from persistence import ScriptWriter
+
+class FakeSession:
+    """Async session stand-in; `delay` simulates a slow or hung database."""
+
+    def __init__(self, rows: list, delay: float):
+        self.rows = rows
+        self.delay = delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, rows):
+        await asyncio.sleep(self.delay)
+        self.rows.extend(rows)
+
+    async def commit(self):
+        pass
+
+def _writer(tmp_path, rows, delay, **kwargs):
+    return ScriptWriter(session_factory=lambda: FakeSession(rows, delay), spool_dir=tmp_path, **kwargs)
+
+def _submit(writer, n):
+    for i in range(n):
+        writer.submit(f"script {i}", f"prompt {i}", {"segment_1": {"voiceover": str(i)}}, "text", 1)
+
+def _spooled(tmp_path) -> list:
+    path = tmp_path / "scripts.jsonl"
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+def test_stop_drains_a_batch_still_accumulating(tmp_path):
+    rows = []
+
+    async def scenario():
+        writer = _writer(tmp_path, rows, delay=0, flush_interval=30)
+        writer.start()
+        _submit(writer, 3)
+        await asyncio.sleep(0.1)
+        await writer.stop(timeout=5)
+
+    asyncio.run(scenario())
+    assert [row["title"] for row in rows] == ["script 0", "script 1", "script 2"]
+    assert _spooled(tmp_path) == []
+
+def test_stop_spools_a_batch_stuck_in_a_slow_insert(tmp_path):
+    rows = []
+
+    async def scenario():
+        writer = _writer(tmp_path, rows, delay=60, flush_interval=0.05)
+        writer.start()
+        _submit(writer, 3)
+        await asyncio.sleep(0.3)
+        await writer.stop(timeout=0.5)
+
+    asyncio.run(scenario())
+    assert rows == []
+    assert sorted(record["title"] for record in _spooled(tmp_path)) == ["script 0", "script 1", "script 2"]
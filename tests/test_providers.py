@@ -0,0 +1,103 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+from providers import Provider, ProviderPool
+
+class FakeEndpoint:
+    """Local OpenAI-compatible server that answers every completion after `delay` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                endpoint.calls += 1
+                time.sleep(endpoint.delay)
+                body = json.dumps({
+                    "id": "x", "object": "chat.completion", "created": 0, "model": "m",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": str(endpoint.delay)},
+                                 "finish_reason": "stop"}],
+                }).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def provider(self, name: str) -> Provider:
+        return Provider(name, self.base_url, "m", "k")
+
+@pytest.fixture
+def endpoints():
+    servers = []
+
+    def make(delay):
+        servers.append(FakeEndpoint(delay))
+        return servers[-1]
+
+    yield make
+    for server in servers:
+        server.server.shutdown()
+        server.server.server_close()
+
+def _warm(provider: Provider, seconds: float, n: int = 20):
+    for _ in range(n):
+        provider.latency.record(seconds)
+
+def _complete_all(pool: ProviderPool, n: int) -> list:
+    async def scenario():
+        return await asyncio.gather(*(pool.complete(messages=[]) for _ in range(n)))
+
+    return asyncio.run(scenario())
+
+def test_no_hedge_before_latency_is_known(endpoints):
+    slow, fast = endpoints(0.6), endpoints(0.01)
+    pool = ProviderPool([slow.provider("slow"), fast.provider("fast")], hedge_min_delay=0.1)
+
+    assert _complete_all(pool, 4) == ["0.6"] * 4
+    assert pool.hedges == 0
+    assert (slow.calls, fast.calls) == (4, 0)
+
+def test_hedges_to_another_endpoint_once_warm(endpoints):
+    slow, fast = endpoints(0.6), endpoints(0.01)
+    primary = slow.provider("slow")
+    _warm(primary, 0.05)
+    pool = ProviderPool([primary, fast.provider("fast")], hedge_min_delay=0.1)
+
+    assert _complete_all(pool, 1) == ["0.01"]
+    assert (pool.hedges, pool.hedge_wins) == (1, 1)
+    assert fast.calls == 1
+
+def test_no_hedge_to_the_same_endpoint(endpoints):
+    slow = endpoints(0.4)
+    provider = slow.provider("slow")
+    _warm(provider, 0.05)
+    pool = ProviderPool([provider], hedge_min_delay=0.1)
+
+    assert _complete_all(pool, 2) == ["0.4"] * 2
+    assert pool.hedges == 0
+    assert slow.calls == 2
+
+def test_hedges_in_flight_are_capped(endpoints):
+    slow, backup = endpoints(0.6), endpoints(0.6)
+    primary = slow.provider("slow")
+    _warm(primary, 0.05)
+    pool = ProviderPool([primary, backup.provider("backup")], hedge_min_delay=0.1, hedge_max_inflight=2)
+
+    _complete_all(pool, 5)
+    assert (pool.hedges, pool.hedges_skipped) == (2, 3)
+    assert (slow.calls, backup.calls) == (5, 2)
+    assert pool._hedges_inflight == 0
@@ -0,0 +1,29 @@
+from retrieval import ReferenceRetriever, chunk_text, estimate_tokens
+
+def test_single_line_reference_is_split_into_chunks():
+    words = [f"word{i}" for i in range(1000)]
+    chunks = chunk_text(" ".join(words), chunk_words=150)
+    assert len(chunks) == 7
+    assert all(len(chunk.split()) <= 150 for chunk in chunks)
+    assert " ".join(chunks).split() == words
+
+def test_short_lines_still_group_into_chunks():
+    text = "\n".join(f"step {i}: stir the sauce" for i in range(60))
+    chunks = chunk_text(text, chunk_words=50)
+    assert all("\n" in chunk for chunk in chunks)
+    assert sum(chunk.count("\n") + 1 for chunk in chunks) == 60
+
+def test_over_budget_single_line_upload_keeps_relevant_passages():
+    filler = " ".join(f"filler{i}" for i in range(5000))
+    text = filler + " garlic butter steak needs a hot pan and resting time " + filler
+    selected = ReferenceRetriever(token_budget=500).select("digest", text, "garlic butter steak")
+    assert selected
+    assert "garlic butter steak" in selected
+    assert estimate_tokens(selected) <= 500
+
+def test_selection_is_never_empty_for_non_empty_text():
+    # One enormous "word": no chunk fits the budget, so the best one is truncated
+    text = "x" * 23_000
+    selected = ReferenceRetriever(token_budget=100).select("digest", text, "steak")
+    assert selected == "x" * 396
+    assert estimate_tokens(selected) <= 100
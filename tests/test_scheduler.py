@@ -0,0 +1,64 @@
+import asyncio
+from scheduler import FairScheduler
+
+def test_multi_slot_holder_counts_against_the_cap():
+    scheduler = FairScheduler(max_concurrent=4)
+    granted = []
+
+    async def holder(name, slots, hold):
+        async with scheduler.slot(name, admit=False, slots=slots):
+            granted.append((name, scheduler._active))
+            await asyncio.sleep(hold)
+
+    async def scenario():
+        candidates = asyncio.create_task(holder("candidates", 3, 0.2))
+        await asyncio.sleep(0.01)
+        # Two more single calls would exceed the cap, so the second waits for the first
+        await asyncio.gather(holder("a", 1, 0.05), holder("b", 1, 0.05), candidates)
+
+    asyncio.run(scenario())
+    assert granted == [("candidates", 3), ("a", 4), ("b", 4)]
+    assert scheduler._active == 0
+
+def test_waiting_multi_slot_request_is_not_starved():
+    scheduler = FairScheduler(max_concurrent=2)
+    order = []
+
+    async def holder(name, slots, hold, delay=0.0):
+        await asyncio.sleep(delay)
+        async with scheduler.slot(name, admit=False, slots=slots):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def scenario():
+        await asyncio.gather(
+            holder("a", 1, 0.1),
+            holder("b", 1, 0.2),
+            holder("candidates", 2, 0.05, delay=0.01),
+            holder("late", 1, 0.05, delay=0.02),
+        )
+
+    asyncio.run(scenario())
+    # "late" fits once "a" finishes, but the pair queued ahead of it goes first
+    assert order == ["a", "b", "candidates", "late"]
+
+def test_cancelled_head_lets_smaller_requests_through():
+    scheduler = FairScheduler(max_concurrent=2)
+
+    async def scenario():
+        async with scheduler.slot("a", admit=False):
+            big = asyncio.create_task(_hold(scheduler, "big", 2))
+            await asyncio.sleep(0.01)
+            small = asyncio.create_task(_hold(scheduler, "small", 1))
+            await asyncio.sleep(0.01)
+            assert not small.done()
+            big.cancel()
+            await asyncio.wait_for(small, 1)
+        await asyncio.gather(big, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert scheduler._active == 0 and scheduler._queued == 0
+
+async def _hold(scheduler, name, slots):
+    async with scheduler.slot(name, admit=False, slots=slots):
+        pass
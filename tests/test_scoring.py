@@ -0,0 +1,125 @@
+import asyncio
+import json
+import shutil
+import types
+from pathlib import Path
+import pytest
+from cache import ResponseCache
+from presenters import SilentPresenter
+from providers import Provider, ProviderPool
+from scoring import Rubric, score_script
+
+REPO = Path(__file__).resolve().parent.parent
+RUBRIC = Rubric.from_prompt((REPO / "prompt.txt").read_text(encoding="utf-8"))
+
+def _words(n: int) -> str:
+    return " ".join(["word"] * n)
+
+def _script(words=(22, 22, 22, 17), times=("0–8s", "8–16s", "16–24s", "24–30s")) -> dict:
+    return {
+        f"segment_{i}": {"time": time, "scene_description": "s", "voiceover": _words(count), "on_screen_text": "t"}
+        for i, (count, time) in enumerate(zip(words, times), 1)
+    }
+
+def test_rubric_reads_timeline_and_word_rule_from_prompt():
+    assert RUBRIC.segments == {"segment_1": (0.0, 8.0), "segment_2": (8.0, 16.0),
+                               "segment_3": (16.0, 24.0), "segment_4": (24.0, 30.0)}
+    assert RUBRIC.words_per == (20, 25, 8)
+    assert Rubric.from_prompt((REPO / "prompt_asmr.txt").read_text(encoding="utf-8")).words_per is None
+
+def test_word_rule_scales_to_the_six_second_final_segment():
+    # 20–25 words per 8 s is 15–18.75 words for 24–30 s
+    score, report = score_script(_script(words=(22, 22, 22, 17)), RUBRIC)
+    assert report["pacing"] == 1.0
+    assert score == 1.0
+
+    # An 8-second amount of narration overruns the final segment
+    _, report = score_script(_script(words=(22, 22, 22, 22)), RUBRIC)
+    assert report["pacing"] < 1.0
+    assert report["problems"] == ["segment_4.voiceover 22 words"]
+
+    _, report = score_script(_script(words=(22, 22, 22, 14)), RUBRIC)
+    assert report["problems"] == ["segment_4.voiceover 14 words"]
+
+def test_timing_rewards_the_expected_slots_then_contiguity():
+    _, exact = score_script(_script(), RUBRIC)
+    # Shifted by a second but still back to back
+    _, shifted = score_script(_script(times=("1–9s", "9–17s", "17–25s", "25–31s")), RUBRIC)
+    # Gaps between segments
+    _, gapped = score_script(_script(times=("0–7s", "9–15s", "17–23s", "26–30s")), RUBRIC)
+    assert exact["timing"] == 1.0
+    assert shifted["timing"] == 0.5
+    # The first segment can't be non-contiguous, so only it earns partial credit
+    assert gapped["timing"] == 0.125
+
+def test_missing_segments_and_fields_lower_completeness():
+    script = _script()
+    del script["segment_4"]
+    script["segment_1"]["on_screen_text"] = ""
+    score, report = score_script(script, RUBRIC)
+    assert report["completeness"] == round(11 / 16, 3)
+    assert "segment_4 missing" in report["problems"]
+    assert "segment_1.on_screen_text empty" in report["problems"]
+    assert score < 0.8
+
+def test_unexpected_segments_are_penalized():
+    script = _script()
+    script["segment_5"] = dict(script["segment_4"])
+    _, report = score_script(script, RUBRIC)
+    assert report["completeness"] == 0.8
+    assert "unexpected segment_5" in report["problems"]
+
+class FakeCompletions:
+    """Answers each call with the next canned reply; an Exception instance is raised instead."""
+
+    def __init__(self, replies: list):
+        self.replies = list(replies)
+
+    async def create(self, **kwargs):
+        reply = self.replies.pop(0)
+        await asyncio.sleep(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=reply))])
+
+@pytest.fixture
+def make_generator(tmp_path, monkeypatch):
+    from generator import ScriptGenerator
+
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test")
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(REPO / "prompt.txt", tmp_path / "prompt.txt")
+
+    def make(replies: list):
+        client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=FakeCompletions(replies)))
+        pool = ProviderPool([Provider("fake", "http://fake", "m", "k", client=client)], max_retries=0, hedge=False)
+        return ScriptGenerator(
+            base_url="http://fake", model="m", system_prompt_path=tmp_path / "prompt.txt",
+            cache=ResponseCache(tmp_path / "responses.sqlite"), providers=pool, presenter=SilentPresenter()
+        )
+
+    return make
+
+def test_candidates_are_ranked_best_first(make_generator):
+    best = _script()
+    overlong = _script(words=(40, 40, 40, 40))
+    shifted = _script(times=("1–9s", "9–17s", "17–25s", "25–31s"))
+    generator = make_generator([json.dumps(overlong), json.dumps(best), json.dumps(shifted)])
+
+    candidates, meta = asyncio.run(generator.generate_candidates("garlic steak", n=3, save=False))
+    assert [c["script"] for c in candidates] == [best, shifted, overlong]
+    assert [c["score"] for c in candidates] == sorted((c["score"] for c in candidates), reverse=True)
+    assert meta["candidates"] == 3 and meta["failed"] == 0
+
+def test_failed_candidates_are_dropped(make_generator):
+    best = _script()
+    generator = make_generator([RuntimeError("upstream down"), json.dumps(best), "not json at all"])
+
+    candidates, meta = asyncio.run(generator.generate_candidates("garlic steak", n=3, save=False))
+    assert [c["script"] for c in candidates] == [best]
+    assert meta["failed"] == 2
+
+def test_error_is_raised_only_when_every_candidate_fails(make_generator):
+    generator = make_generator([RuntimeError("first"), RuntimeError("second")])
+    with pytest.raises(RuntimeError, match="second"):
+        asyncio.run(generator.generate_candidates("garlic steak", n=2, save=False))
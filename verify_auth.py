@@ -39,7 +39,7 @@ def verify_auth_flow():
     
     # 4. Fetch History Securely
     print("4. Fetching History...")
-    hist = requests.get(f"{BASE_URL}/api/history", headers=headers).json()
+    hist = requests.get(f"{BASE_URL}/api/history", headers=headers).json()["items"]
     titles = [s['title'] for s in hist]
     print(f"History: {titles}")
 
@@ -34,7 +34,7 @@ def verify_user_history():
 
     # Fetch History for User A
     print("Fetching history for User A...")
-    hist_a = requests.get(f"{BASE_URL}/api/history", params={"user_id": user_a}).json()
+    hist_a = requests.get(f"{BASE_URL}/api/history", params={"user_id": user_a}).json()["items"]
     
     # Assert A sees A's script
     titles_a = [s['title'] for s in hist_a]
@@ -46,7 +46,7 @@ def verify_user_history():
 
     # Fetch History for User B
     print("Fetching history for User B...")
-    hist_b = requests.get(f"{BASE_URL}/api/history", params={"user_id": user_b}).json()
+    hist_b = requests.get(f"{BASE_URL}/api/history", params={"user_id": user_b}).json()["items"]
     
     # Assert B sees B's script
     titles_b = [s['title'] for s in hist_b]